@@ -9,9 +9,18 @@ import maya.cmds as cmds
 import pymel.all as pm
 import maya.mel as mel
 import maya.OpenMayaUI as omui
+import maya.api.OpenMaya as om
 from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
 
-import json, os, sys
+import json, os, re, sys, time, gzip, hashlib, zlib
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+# Optional numpy, required for vectorized skin weight processing
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Import Qt libraries
 try:
@@ -67,9 +76,168 @@ class ToolButton(QPushButton):
         self.setFixedSize(self._size, self._size)
 
 
+class NGramIndex(object):
+    """ Case-insensitive substring index, every gram up to n characters long maps to the ids of the texts containing it """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.grams = {}
+        self.texts = {}
+
+
+    def Clear(self):
+        self.grams = {}
+        self.texts = {}
+
+
+    def Add(self, id, text):
+        text = text.lower()
+        self.texts[id] = text
+        for size in range(1, self.n + 1):
+            for i in range(len(text) - size + 1):
+                self.grams.setdefault(text[i:i + size], set()).add(id)
+
+
+    def Search(self, query):
+        """ Ids of every text containing the query """
+        query = query.lower()
+        if len(query) == 0:
+            return set(self.texts)
+
+        # Intersect postings smallest first, then confirm the full substring as grams can match out of order
+        size = min(self.n, len(query))
+        postings = sorted((self.grams.get(query[i:i + size], set()) for i in range(len(query) - size + 1)), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+        if len(query) <= self.n:
+            return candidates
+        return set(id for id in candidates if query in self.texts[id])
+
+
 ############################################################################### EXPORT NODES #############################################################################
 
 
+def GetNodeTypes(longNames):
+    """ Map long names to the type to display them as, the first shape's type for transforms with shapes. Bulk queries only """
+    found = cmds.ls(longNames, long=True, showType=True) or []
+    nodeTypes = dict(zip(found[0::2], found[1::2]))
+    if not nodeTypes:
+        return nodeTypes
+
+    # Shapes of every node at once, mapped back to their parent by long name
+    shapes = cmds.listRelatives(list(nodeTypes), shapes=True, fullPath=True) or []
+    if shapes:
+        found = cmds.ls(shapes, long=True, showType=True) or []
+        resolved = set()
+        for shape, shapeType in zip(found[0::2], found[1::2]):
+            parent = shape.rsplit("|", 1)[0]
+            if parent in nodeTypes and parent not in resolved:
+                nodeTypes[parent] = shapeType
+                resolved.add(parent)
+    return nodeTypes
+
+
+class ExportSetResolver(object):
+    """ Resolves the full export set from skinned meshes or root joints. Traversals are cached per rig, and the cache is
+        dropped whenever the DAG or a skinCluster's influences change """
+
+    def __init__(self):
+        self._cache = {}
+        self._callbacks = []
+        try:
+            self._callbacks.append(om.MDagMessage.addAllDagChangesCallback(self.Invalidate))
+            self._callbacks.append(om.MDGMessage.addNodeRemovedCallback(self.Invalidate, "dagNode"))
+            self._callbacks.append(om.MDGMessage.addConnectionCallback(self._OnConnectionChanged))
+            self._callbacks.append(om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, self.Invalidate))
+            self._callbacks.append(om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, self.Invalidate))
+        except:
+            print("Failed to register DAG callbacks, call Invalidate() after changing rigs")
+
+
+    def Invalidate(self, *args):
+        self._cache.clear()
+
+
+    def _OnConnectionChanged(self, srcPlug, dstPlug, made, clientData=None):
+        # Influences are connections into the skinCluster
+        if self._cache and dstPlug.node().apiTypeStr == "kSkinClusterFilter":
+            self.Invalidate()
+
+
+    def Dispose(self):
+        """ Remove the scene callbacks """
+        if self._callbacks:
+            om.MMessage.removeCallbacks(self._callbacks)
+            self._callbacks = []
+        self.Invalidate()
+
+
+    def Resolve(self, nodes):
+        """ Long names of the export set for skinned meshes and/or root joints: the mesh transforms, every influence,
+            every joint below a root joint & every joint above any of those """
+        key = tuple(sorted(cmds.ls(nodes, long=True) or [])) if nodes else ()
+        if key not in self._cache:
+            self._cache[key] = self._Traverse(list(key))
+        return list(self._cache[key])
+
+
+    def _Traverse(self, nodes):
+        if not nodes:
+            return []
+
+        # Meshes & root joints among the inputs
+        joints = set(cmds.ls(nodes, type="joint", long=True) or [])
+        shapes = cmds.ls(nodes, type="mesh", long=True, noIntermediate=True) or []
+        shapes += cmds.listRelatives(nodes, shapes=True, type="mesh", fullPath=True, noIntermediate=True) or []
+        meshes = set(shape.rsplit("|", 1)[0] for shape in shapes)
+
+        # Root joints bring their whole joint hierarchy
+        if joints:
+            joints.update(cmds.listRelatives(list(joints), allDescendents=True, type="joint", fullPath=True) or [])
+
+        # Skin clusters of every mesh from one history query, then their influences
+        if shapes:
+            skins = set(cmds.ls(cmds.listHistory(shapes, pruneDagObjects=True) or [], type="skinCluster") or [])
+            influences = []
+            for skin in skins:
+                influences += cmds.skinCluster(skin, query=True, influence=True) or []
+            if influences:
+                joints.update(cmds.ls(influences, long=True) or [])
+
+        # Joints above anything in the set are needed for the hierarchy to export intact, long names already list them
+        ancestors = set()
+        for joint in joints:
+            parts = joint.split("|")
+            for i in range(2, len(parts)):
+                ancestors.add("|".join(parts[:i]))
+        ancestors -= joints
+        if ancestors:
+            joints.update(cmds.ls(list(ancestors), type="joint", long=True) or [])
+
+        return sorted(meshes) + sorted(joints - meshes)
+
+
+_exportSetResolver = None
+
+
+def GetExportSetResolver():
+    """ Shared resolver, so the cache survives across tabs """
+    global _exportSetResolver
+    if _exportSetResolver is None:
+        _exportSetResolver = ExportSetResolver()
+    return _exportSetResolver
+
+
+def DisposeExportSetResolver():
+    global _exportSetResolver
+    if _exportSetResolver is not None:
+        _exportSetResolver.Dispose()
+        _exportSetResolver = None
+
+
 class ExportNodesTree(QTreeWidget):
     """ Widget to contain interface with skeleton data """
 
@@ -94,6 +262,14 @@ class ExportNodesTree(QTreeWidget):
         # Sort mode
         self.setSortingEnabled(True)
 
+        # Filter index over long names, rebuilt lazily after nodes change
+        self._index = NGramIndex()
+        self._indexDirty = True
+        self._filter = ""
+
+        # Long names in the tree, kept alongside the items so duplicate checks don't walk the whole tree per add
+        self._longNames = set()
+
 
     def OpenContextMenu(self, position):
         self.cursorPosition = position
@@ -104,6 +280,9 @@ class ExportNodesTree(QTreeWidget):
         action = QAction("Add Selected Nodes", self)
         action.triggered.connect(self.AddSelectedObjects)
         self.menu.addAction(action)
+        action = QAction("Add Export Set From Selected", self)
+        action.triggered.connect(self.AddResolvedExportSet)
+        self.menu.addAction(action)
         action = QAction("Remove", self)
         action.triggered.connect(self.Remove)
         self.menu.addAction(action)
@@ -115,32 +294,22 @@ class ExportNodesTree(QTreeWidget):
 
 
     def AddSelectedObjects(self):
-        selection = pm.ls(selection=True)
-        for s in selection:
-            self.AddNode(s)
+        self.AddNodesFromData(cmds.ls(selection=True, long=True) or [])
+
+
+    def AddResolvedExportSet(self):
+        """ Add the full export set of the selected skinned meshes or root joints """
+        self.AddNodesFromData(GetExportSetResolver().Resolve(cmds.ls(selection=True, long=True) or []))
 
 
     def AddNodeFromLongName(self, longName=""):
         assert(len(longName) > 0)
+        self.AddNodesFromData([longName])
 
-        # Check unique, return if not
-        root = self.invisibleRootItem()
-        for i in range(root.childCount()):
-            item = root.child(i)
-            itemLongName = item.text(1)
-            if longName == itemLongName:
-                return
 
-        pyNode = pm.PyNode(longName)
+    def _CreateItem(self, longName, nodeType):
         nodeName = longName.rsplit("|", 1)[-1]
 
-        # Return node type
-        try:
-            shape = pm.listRelatives(pyNode, children=True, s=True)[0]
-            nodeType = pm.nodeType(shape, q=True)
-        except:
-            nodeType = pm.nodeType(pyNode, q=True)
-
         # Construct item widget
         item = QTreeWidgetItem()
         item.setText(0, nodeName)
@@ -158,7 +327,7 @@ class ExportNodesTree(QTreeWidget):
             icon = QIcon(":/locator.svg")
         item.setIcon(0, icon)
 
-        self.addTopLevelItem(item)
+        return item
 
 
     def AddNode(self, object=None):
@@ -167,13 +336,68 @@ class ExportNodesTree(QTreeWidget):
 
 
     def AddNodesFromData(self, data):
+        """ Add nodes by long name, skipping duplicates. Node types are resolved in bulk rather than per node """
+        longNames = []
         for longName in data:
-            self.AddNodeFromLongName(longName)
+            if longName not in self._longNames:
+                self._longNames.add(longName)
+                longNames.append(longName)
+        if not longNames:
+            return
+
+        nodeTypes = GetNodeTypes(longNames)
+        for longName in longNames:
+            if longName not in nodeTypes:
+                print("Export node '{}' not found in the scene".format(longName))
+
+        # A single node is inserted in place, a batch is inserted before sorting & repainting once
+        items = [self._CreateItem(longName, nodeTypes.get(longName)) for longName in longNames]
+        if len(items) == 1:
+            self.addTopLevelItem(items[0])
+        else:
+            self.setUpdatesEnabled(False)
+            self.setSortingEnabled(False)
+            try:
+                self.addTopLevelItems(items)
+            finally:
+                self.setSortingEnabled(True)
+                self.setUpdatesEnabled(True)
+        self._indexDirty = True
+        self._Refilter()
 
 
     def Remove(self):
         for item in self.selectedItems():
             (item.parent() or self.invisibleRootItem()).removeChild(item)
+            self._longNames.discard(item.text(1))
+        self._indexDirty = True
+
+
+    def _Refilter(self):
+        """ Keep an active filter applied after nodes are added """
+        if self._filter:
+            self.Filter(self._filter)
+
+
+    def Filter(self, text):
+        """ Show only nodes whose long name contains the text """
+        self._filter = text
+        root = self.invisibleRootItem()
+
+        # Keyed by long name rather than row, sorting by a header click reorders the items
+        if self._indexDirty:
+            self._index.Clear()
+            for i in range(root.childCount()):
+                self._index.Add(root.child(i).text(1), root.child(i).text(1))
+            self._indexDirty = False
+
+        visible = self._index.Search(text)
+        self.setUpdatesEnabled(False)
+        try:
+            for i in range(root.childCount()):
+                root.child(i).setHidden(root.child(i).text(1) not in visible)
+        finally:
+            self.setUpdatesEnabled(True)
 
 
     def GetData(self):
@@ -188,6 +412,688 @@ class ExportNodesTree(QTreeWidget):
 ###########################################################################################################################################################################
 
 
+class ClipValidation(object):
+    """ Result of validating clip data before export """
+
+    def __init__(self):
+        self.errors = [] # Would produce wrong or overwritten files, blocks export
+        self.warnings = [] # Redundant work, export can continue
+        self.ranges = [] # Minimal union of enabled frame ranges as [(start, end), ..], inclusive
+        self.clipFrames = 0 # Frames baked if every enabled clip is evaluated separately
+
+
+    def IsValid(self):
+        return len(self.errors) == 0
+
+
+    def UnionFrames(self):
+        """ Frames that actually need evaluating """
+        return sum(end - start + 1 for start, end in self.ranges)
+
+
+def ValidateClips(clips, overlapThreshold=0.5):
+    """ Validate clip data, flagging inverted ranges, duplicate names & heavily overlapping clips, and merge the enabled
+        ranges into their minimal union. Sort-and-sweep, so it scales to thousands of clips """
+    result = ClipValidation()
+
+    # Per-clip checks, only enabled clips get exported
+    names = {}
+    intervals = []
+    for row, clip in enumerate(clips):
+        if not clip["enabled"]:
+            continue
+        name = clip["animationName"]
+        start, end = clip["frameStart"], clip["frameEnd"]
+
+        if len(name.strip()) == 0:
+            result.errors.append("Clip on row {} has no animation name".format(row + 1))
+        if start > end:
+            result.errors.append("Clip '{}' on row {} has an inverted range {} to {}".format(name, row + 1, start, end))
+            continue
+
+        # Exported filenames are case-insensitive on Windows, but whitespace still makes a different file
+        key = name.lower()
+        if key in names:
+            result.errors.append("Clip '{}' on row {} would overwrite the export of row {}".format(name, row + 1, names[key] + 1))
+        else:
+            names[key] = row
+
+        intervals.append((start, end, row, name))
+        result.clipFrames += end - start + 1
+
+    # Sweep in start order, keeping only the clips still open at each start
+    intervals.sort()
+    active = []
+    for start, end, row, name in intervals:
+        active = [a for a in active if a[1] >= start]
+        for otherStart, otherEnd, otherRow, otherName in active:
+            overlap = min(end, otherEnd) - start + 1
+            shortest = min(end - start, otherEnd - otherStart) + 1
+            if overlap >= shortest * overlapThreshold:
+                result.warnings.append("Clips '{}' (row {}) and '{}' (row {}) share {} of their frames".format(otherName, otherRow + 1, name, row + 1, overlap))
+        active.append((start, end, row, name))
+
+        # Merge into the union, touching ranges join up as frames are whole
+        if result.ranges and start <= result.ranges[-1][1] + 1:
+            result.ranges[-1] = (result.ranges[-1][0], max(result.ranges[-1][1], end))
+        else:
+            result.ranges.append((start, end))
+
+    return result
+
+
+############################################################################### CLIP DISCOVERY ###########################################################################
+
+
+def _ClipData(name, start, end):
+    return {"enabled": True, "animationName": name, "frameStart": int(round(start)), "frameEnd": int(round(end))}
+
+
+_clipNumber = re.compile(r"(.*?)(\d*)$")
+
+
+def UniqueClipName(name, taken):
+    """ The name, or the name with its trailing number counted up until it isn't in taken. Names are compared
+        lowercase, the same way ValidateClips finds clashes """
+    if name.lower() not in taken:
+        return name
+    base, digits = _clipNumber.match(name).groups()
+    number = int(digits) if digits else 1
+    while True:
+        number += 1
+        candidate = "{}{:0{}d}".format(base, number, len(digits))
+        if candidate.lower() not in taken:
+            return candidate
+
+
+def DiscoverBookmarkClips():
+    """ Clips from time slider bookmarks """
+    clips = []
+    for bookmark in cmds.ls(type="timeSliderBookmark") or []:
+        try:
+            name = cmds.getAttr(bookmark + ".name") or bookmark
+            clips.append(_ClipData(name, cmds.getAttr(bookmark + ".timeRangeStart"), cmds.getAttr(bookmark + ".timeRangeStop")))
+        except:
+            print("Failed to read bookmark '{}'".format(bookmark))
+    return clips
+
+
+def DiscoverTimeEditorClips():
+    """ Clips from the Time Editor """
+    clips = []
+    for clip in cmds.ls(type="timeEditorClip") or []:
+        try:
+            name = cmds.getAttr(clip + ".clip[0].clipName") or clip
+            start = cmds.getAttr(clip + ".clip[0].clipStart")
+            clips.append(_ClipData(name, start, start + cmds.getAttr(clip + ".clip[0].clipDuration")))
+        except:
+            print("Failed to read Time Editor clip '{}'".format(clip))
+    return clips
+
+
+def DiscoverTraxClips():
+    """ Clips scheduled in Trax, source clips in the library are ignored """
+    clips = []
+    for clip in cmds.ls(type="animClip") or []:
+        try:
+            if not cmds.getAttr(clip + ".clipInstance"):
+                continue
+            start = cmds.getAttr(clip + ".startFrame")
+            length = (cmds.getAttr(clip + ".sourceEnd") - cmds.getAttr(clip + ".sourceStart")) * cmds.getAttr(clip + ".scale") * cmds.getAttr(clip + ".cycle")
+            clips.append(_ClipData(clip, start, start + length))
+        except:
+            print("Failed to read Trax clip '{}'".format(clip))
+    return clips
+
+
+def GetAnimCurveKeys(nodes):
+    """ Key times & values of every animation curve driving the nodes, as a (times, values) pair per curve """
+    keys = []
+    for curve in sorted(set(cmds.keyframe(nodes, query=True, name=True) or [])):
+        times = cmds.keyframe(curve, query=True, timeChange=True) or []
+        values = cmds.keyframe(curve, query=True, valueChange=True) or []
+        keys.append((times, values))
+    return keys
+
+
+def SampleAnimCurves(keys, frames):
+    """ Resample curve keys onto frames as a (numFrames, numCurves) array, linear between keys """
+    assert np is not None, "numpy is required to sample animation curves"
+
+    samples = np.zeros((len(frames), len(keys)))
+    for i, (times, values) in enumerate(keys):
+        if len(times) > 0:
+            samples[:, i] = np.interp(frames, times, values)
+    return samples
+
+
+def SegmentByKeyGaps(keyTimes, minGap=5):
+    """ Split key times into (start, end) ranges wherever no curve is keyed for more than minGap frames """
+    assert np is not None, "numpy is required to segment animation"
+
+    times = np.unique(np.asarray(keyTimes, dtype=np.float64))
+    if len(times) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(times) > minGap)
+    starts = times[np.concatenate(([0], breaks + 1))]
+    ends = times[np.concatenate((breaks, [len(times) - 1]))]
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def GetMotionMask(keys, frames, tolerance=1e-3, chunkSize=4096):
+    """ Whether each step from one frame to the next is moving, that is any curve changes by more than the tolerance.
+        Curves are sampled a chunk of frames at a time, so long takes never need every curve sampled on every frame at once """
+    assert np is not None, "numpy is required to segment animation"
+
+    frames = np.asarray(frames)
+    moving = np.zeros(max(len(frames) - 1, 0), dtype=bool)
+    for start in range(0, len(moving), chunkSize):
+        # Chunks overlap by a frame so the step across the boundary is included
+        samples = SampleAnimCurves(keys, frames[start:start + chunkSize + 1])
+        moving[start:start + chunkSize] = np.abs(np.diff(samples, axis=0)).max(axis=1, initial=0.0) > tolerance
+    return moving
+
+
+def SegmentByMotion(frames, moving, minStaticFrames=10):
+    """ Split frames into moving (start, end) ranges from a motion mask, separated by static poses held for at least
+        minStaticFrames """
+    assert np is not None, "numpy is required to segment animation"
+
+    frames = np.asarray(frames)
+    if len(frames) < 2:
+        return []
+
+    edges = np.diff(np.concatenate(([0], moving.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return []
+
+    # Only holds that last long enough split clips, shorter pauses stay inside the clip
+    keep = (starts[1:] - ends[:-1]) >= minStaticFrames
+    starts = starts[np.concatenate(([True], keep))]
+    ends = ends[np.concatenate((keep, [True]))]
+    return list(zip(frames[starts].tolist(), frames[ends].tolist()))
+
+
+def DiscoverKeyGapClips(nodes, minGap=5, prefix="Take"):
+    """ Clips from runs of keys on the nodes' curves, split at gaps longer than minGap frames """
+    keys = GetAnimCurveKeys(nodes) if nodes else []
+    keyTimes = [t for times, values in keys for t in times]
+    return [_ClipData("{}{:02d}".format(prefix, i + 1), start, end) for i, (start, end) in enumerate(SegmentByKeyGaps(keyTimes, minGap))]
+
+
+def DiscoverMotionClips(nodes, tolerance=1e-3, minStaticFrames=10, prefix="Take"):
+    """ Clips from the moving sections of the nodes' curves, split at held static poses """
+    keys = GetAnimCurveKeys(nodes) if nodes else []
+    keyTimes = [t for times, values in keys for t in times]
+    if len(keyTimes) == 0:
+        return []
+
+    frames = np.arange(np.floor(min(keyTimes)), np.ceil(max(keyTimes)) + 1)
+    segments = SegmentByMotion(frames, GetMotionMask(keys, frames, tolerance), minStaticFrames)
+    return [_ClipData("{}{:02d}".format(prefix, i + 1), start, end) for i, (start, end) in enumerate(segments)]
+
+
+############################################################################### EXPORT SESSION ###########################################################################
+
+
+class ExportSession(object):
+    """ Context for a run of FBX exports. Snapshots the scene state once, suspends viewport refresh, selects the export
+        nodes in one call & switches to the fastest evaluation mode, then restores everything on exit, even on failure.
+        That setup is timed, exports used to redo it per file, so the time saved is reported against the export times """
+
+    def __init__(self, nodes=None, evaluationMode="parallel"):
+        self.nodes = list(nodes or [])
+        self.evaluationMode = evaluationMode
+        self.exportTimes = []
+        self.setupTime = 0.0
+
+
+    def __enter__(self):
+        self.startTime = time.time()
+
+        # Snapshot
+        self.selection = cmds.ls(selection=True, long=True) or []
+        self.minTime = cmds.playbackOptions(query=True, minTime=True)
+        self.maxTime = cmds.playbackOptions(query=True, maxTime=True)
+        self.currentTime = cmds.currentTime(query=True)
+        try:
+            self.previousEvaluationMode = cmds.evaluationManager(query=True, mode=True)[0]
+        except:
+            self.previousEvaluationMode = None
+
+        # __exit__ isn't called if this raises, so restore whatever was changed here, such as when an export node was deleted
+        start = time.time()
+        try:
+            # Suspend viewport refresh & switch evaluation mode for baking
+            cmds.refresh(suspend=True)
+            if self.evaluationMode and self.previousEvaluationMode not in (None, self.evaluationMode):
+                cmds.evaluationManager(mode=self.evaluationMode)
+
+            # Select the whole node set in one call
+            if self.nodes:
+                cmds.select(self.nodes, replace=True)
+            else:
+                cmds.select(clear=True)
+        except:
+            self.__exit__(*sys.exc_info())
+            raise
+        self.setupTime = time.time() - start
+
+        return self
+
+
+    def Export(self, filename):
+        """ FBX export the selected nodes to filename, timing it """
+        start = time.time()
+        pm.mel.FBXExport(f=filename, s=True)
+        self.exportTimes.append(time.time() - start)
+
+
+    def __exit__(self, excType, excValue, traceback):
+        # Restore each piece separately so one failure doesn't leave the rest of the scene changed
+        def Restore(func, *args, **kwargs):
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print("Failed to restore scene state: {}".format(e))
+
+        if self.evaluationMode and self.previousEvaluationMode not in (None, self.evaluationMode):
+            Restore(cmds.evaluationManager, mode=self.previousEvaluationMode)
+        Restore(cmds.playbackOptions, minTime=self.minTime, maxTime=self.maxTime)
+        Restore(cmds.currentTime, self.currentTime, update=True)
+        if self.selection:
+            Restore(cmds.select, self.selection, replace=True)
+        else:
+            Restore(cmds.select, clear=True)
+        Restore(cmds.refresh, suspend=False)
+
+        # Report, every export after the first used to pay for the setup again
+        numExports = len(self.exportTimes)
+        if numExports > 0:
+            exportTime = sum(self.exportTimes)
+            saved = self.setupTime * (numExports - 1)
+            print("Exported {} files in {:.2f}s, {:.3f}s per export".format(numExports, time.time() - self.startTime, exportTime / numExports))
+            print("Set up once in {:.3f}s, saving ~{:.3f}s over setting up per export, {:.1f}% of the export time".format(self.setupTime, saved, 100.0 * saved / max(exportTime, 1e-9)))
+        return False
+
+
+############################################################################### EXPORT JOURNAL ###########################################################################
+
+
+def GetExportJournalFilename():
+    """ Journal sits next to the scene, like the metadata json """
+    currentFile = cmds.file(q=True, sn=True)
+    if not currentFile:
+        return os.path.join(cmds.internalVar(userTmpDir=True), "untitled_ExportJournal.jsonl")
+    return os.path.join(os.path.dirname(currentFile), "{}_ExportJournal.jsonl".format(os.path.basename(currentFile).rsplit(".", 1)[0]))
+
+
+def GetSceneStamp():
+    """ Saved state of the scene, unsaved changes can't be verified so they get a stamp that never matches. Take it once
+        before a batch, exporting itself can dirty the scene """
+    currentFile = cmds.file(q=True, sn=True)
+    if cmds.file(q=True, modified=True) or not currentFile or not os.path.exists(currentFile):
+        return time.time()
+    return [currentFile, os.path.getmtime(currentFile)]
+
+
+def HashExportInputs(sceneStamp, *inputs):
+    """ Hash of everything that affects an export, including the scene stamp from GetSceneStamp() """
+    return hashlib.sha1(json.dumps([sceneStamp, inputs], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ExportJournal(object):
+    """ Append-only log of finished & failed exports, one json line per clip or bind, so an interrupted batch can
+        resume. Compacted down to the latest entry per item once the log grows well past the number of items """
+
+    def __init__(self, filename, resume=False, compactRatio=4, minCompactLines=256):
+        self.filename = filename
+        self.resume = resume
+        self.compactRatio = compactRatio
+        self.minCompactLines = minCompactLines
+        self.entries = {}
+        self.numLines = 0
+        self._file = None
+        self._tornLine = False
+        self._Read()
+
+
+    def _Read(self):
+        # Finish an interrupted compaction
+        temp = self.filename + ".tmp"
+        if not os.path.exists(self.filename) and os.path.exists(temp):
+            os.rename(temp, self.filename)
+        if not os.path.exists(self.filename):
+            return
+
+        with open(self.filename, "r") as inFile:
+            for line in inFile:
+                self._tornLine = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # Torn last line from a crash
+                self.entries[entry["key"]] = entry
+                self.numLines += 1
+
+
+    @staticmethod
+    def Key(filename):
+        return os.path.normcase(os.path.abspath(filename))
+
+
+    def IsDone(self, filename, inputsHash):
+        """ Whether resuming can skip this export: it succeeded with the same inputs & the file is still there """
+        if not self.resume:
+            return False
+        entry = self.entries.get(self.Key(filename))
+        return entry is not None and entry["status"] == "done" and entry["hash"] == inputsHash and os.path.exists(filename)
+
+
+    def Record(self, filename, inputsHash, status="done"):
+        entry = {"key": self.Key(filename), "hash": inputsHash, "output": filename, "status": status, "time": time.time()}
+        self.entries[entry["key"]] = entry
+
+        # Flushed per line so a Maya crash keeps everything up to the last finished export
+        if self._file is None:
+            self._file = open(self.filename, "a")
+            if self._tornLine:
+                self._file.write("\n")
+                self._tornLine = False
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self.numLines += 1
+
+        if self.numLines >= max(self.minCompactLines, len(self.entries) * self.compactRatio):
+            self.Compact()
+
+
+    def Compact(self):
+        """ Rewrite the log keeping only the latest entry per item """
+        self.Close()
+        temp = self.filename + ".tmp"
+        with open(temp, "w") as outFile:
+            for entry in self.entries.values():
+                outFile.write(json.dumps(entry) + "\n")
+
+        # os.replace is atomic but Python 3 only
+        replace = getattr(os, "replace", None)
+        if replace is not None:
+            replace(temp, self.filename)
+        else:
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(temp, self.filename)
+        self.numLines = len(self.entries)
+
+
+    def Close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
+        return False
+
+
+############################################################################### SAMPLE CACHE #############################################################################
+
+
+SAMPLE_CHANNELS = ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ"]
+SAMPLE_CURVE_TYPES = ["animCurveTL"] * 3 + ["animCurveTA"] * 3 + ["animCurveTU"] * 3
+
+
+def GetAnimationFingerprint():
+    """ Cheap fingerprint of the scene's animation from the keys & tangents of every curve. Changes that aren't keyed,
+        such as constraint offsets, aren't seen, clear the sample cache after making them """
+    curves = cmds.ls(type="animCurve") or []
+    digest = hashlib.sha1(json.dumps([cmds.file(q=True, sn=True), curves]).encode("utf-8"))
+    if curves:
+        for data in (cmds.keyframe(curves, query=True, timeChange=True),
+                     cmds.keyframe(curves, query=True, valueChange=True),
+                     cmds.keyTangent(curves, query=True, inAngle=True),
+                     cmds.keyTangent(curves, query=True, outAngle=True)):
+            digest.update(json.dumps(data or []).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def SampleTransforms(nodes, frames):
+    """ Evaluate the nodes' local transform channels at each frame, as a (numFrames, numNodes, 9) array """
+    assert np is not None, "numpy is required to sample transforms"
+
+    samples = np.zeros((len(frames), len(nodes), len(SAMPLE_CHANNELS)))
+    for f, frame in enumerate(frames):
+        cmds.currentTime(frame, update=True)
+        for n, node in enumerate(nodes):
+            samples[f, n, 0:3] = cmds.getAttr(node + ".translate")[0]
+            samples[f, n, 3:6] = cmds.getAttr(node + ".rotate")[0]
+            samples[f, n, 6:9] = cmds.getAttr(node + ".scale")[0]
+    return samples
+
+
+def CreateSampleCurves(nodes):
+    """ Drive the nodes' unlocked transform channels from new, empty curves, replacing their inputs. Returns
+        (node index, channel index, curve) per curve. Run inside an undo chunk & undo it to get the rig back """
+    curves = []
+    for n, node in enumerate(nodes):
+        for c, channel in enumerate(SAMPLE_CHANNELS):
+            plug = "{}.{}".format(node, channel)
+            if cmds.getAttr(plug, lock=True):
+                continue
+            curve = cmds.createNode(SAMPLE_CURVE_TYPES[c])
+            cmds.connectAttr(curve + ".output", plug, force=True)
+            curves.append((n, c, curve))
+    return curves
+
+
+def SetSampledKeys(curves, frames, samples):
+    """ Replace the keys of curves from CreateSampleCurves with a linear key per sampled frame """
+    if not curves:
+        return
+    frames = list(frames)
+    names = [curve for n, c, curve in curves]
+    cmds.cutKey(names, clear=True)
+    for n, c, curve in curves:
+        # Set every key in one call
+        keys = [value for key in zip(frames, samples[:, n, c].tolist()) for value in key]
+        cmds.setAttr("{}.ktv[0:{}]".format(curve, len(frames) - 1), *keys)
+    cmds.keyTangent(names, inTangentType="linear", outTangentType="linear")
+
+
+class SampleCache(object):
+    """ On-disk cache of sampled transforms, one .npy file per entry, memory-mapped when read. Each file's mtime is its
+        last access, so Maya sessions sharing the directory see & evict each other's entries. Least recently used
+        entries are evicted once the cache grows past its size cap """
+
+    def __init__(self, directory=None, maxBytes=2 << 30):
+        assert np is not None, "numpy is required for the sample cache"
+
+        self.directory = directory or os.path.join(cmds.internalVar(userAppDir=True), "AnimationExporterCache")
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+
+    @staticmethod
+    def Key(nodes, frameStart, frameEnd, fingerprint):
+        return hashlib.sha1(json.dumps([list(nodes), frameStart, frameEnd, fingerprint, SAMPLE_CHANNELS]).encode("utf-8")).hexdigest()
+
+
+    def _Path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+
+    def _Entries(self):
+        """ (key, size, last access) of every entry on disk, including those written by other sessions """
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".npy"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, filename))
+            except OSError:
+                continue # Evicted by another session meanwhile
+            entries.append((filename[:-4], st.st_size, st.st_mtime))
+        return entries
+
+
+    def Get(self, key):
+        """ Memory-mapped samples for the key, or None on a miss. A hit touches the file to mark it recently used """
+        try:
+            os.utime(self._Path(key), None)
+            samples = np.load(self._Path(key), mmap_mode="r")
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return samples
+
+
+    def Put(self, key, samples):
+        # Write to a temp file first so a crash never leaves a truncated entry, named per process as sessions share the cache
+        temp = "{}.{}.tmp".format(self._Path(key), os.getpid())
+        with open(temp, "wb") as outFile:
+            np.save(outFile, np.ascontiguousarray(samples))
+
+        # os.replace is atomic but Python 3 only
+        replace = getattr(os, "replace", None)
+        if replace is not None:
+            replace(temp, self._Path(key))
+        else:
+            if os.path.exists(self._Path(key)):
+                os.remove(self._Path(key))
+            os.rename(temp, self._Path(key))
+        self._Evict()
+
+        # Hand back the stored copy memory-mapped, so large samples don't stay in memory
+        if os.path.exists(self._Path(key)):
+            return np.load(self._Path(key), mmap_mode="r")
+        return samples
+
+
+    def _Evict(self):
+        entries = self._Entries()
+        total = sum(size for key, size, lastAccess in entries)
+        for key, size, lastAccess in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(self._Path(key))
+            except OSError:
+                continue # Still mapped on Windows or already evicted by another session, try again next time
+            total -= size
+            self.evictions += 1
+
+
+    def Clear(self):
+        for key, size, lastAccess in self._Entries():
+            try:
+                os.remove(self._Path(key))
+            except OSError:
+                pass
+
+
+    def Stats(self):
+        lookups = self.hits + self.misses
+        entries = self._Entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / float(lookups) if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for key, size, lastAccess in entries)
+        }
+
+
+_sampleCache = None
+
+
+def GetSampleCache():
+    """ Shared cache so statistics accumulate over the session """
+    global _sampleCache
+    if _sampleCache is None:
+        _sampleCache = SampleCache()
+    return _sampleCache
+
+
+class CachedSampleBake(object):
+    """ Drives the export nodes from cached samples, keyed per clip range, evaluating the rig only on a cache miss. Each
+        clip's samples are keyed on every frame before it's exported, so the FBX export doesn't bake & the rig isn't
+        evaluated at all on a hit. Everything is undone on exit """
+
+    def __init__(self, nodes, clips, cache=None):
+        self.nodes = (cmds.ls(nodes, type="transform", long=True) or []) if nodes else []
+        self.ranges = sorted(set((int(c["frameStart"]), int(c["frameEnd"])) for c in clips))
+        self.cache = cache or GetSampleCache()
+        self.samples = {}
+        self.curves = []
+        self.applied = False
+
+
+    def __enter__(self):
+        if not self.nodes or not self.ranges:
+            return self
+        if not cmds.undoInfo(query=True, state=True):
+            print("Undo is disabled, baking from the rig instead of the sample cache")
+            return self
+
+        # Gather samples per clip range while the rig still drives the nodes, evaluating only what's missing
+        fingerprint = GetAnimationFingerprint()
+        for frameStart, frameEnd in self.ranges:
+            key = SampleCache.Key(self.nodes, frameStart, frameEnd, fingerprint)
+            samples = self.cache.Get(key)
+            if samples is None:
+                start = time.time()
+                samples = self.cache.Put(key, SampleTransforms(self.nodes, list(range(frameStart, frameEnd + 1))))
+                print("Sampled {} nodes over frames {} to {} in {:.2f}s".format(len(self.nodes), frameStart, frameEnd, time.time() - start))
+            self.samples[(frameStart, frameEnd)] = samples
+
+        # __exit__ isn't called if this raises, so undo a partial apply here
+        self.wasModified = cmds.file(q=True, modified=True)
+        cmds.undoInfo(openChunk=True, chunkName="AnimationExporterCachedSampleBake")
+        self.applied = True
+        try:
+            self.curves = CreateSampleCurves(self.nodes)
+        except:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+
+    def Apply(self, frameStart, frameEnd):
+        """ Key the sample curves with a clip's samples """
+        SetSampledKeys(self.curves, range(int(frameStart), int(frameEnd) + 1), self.samples[(int(frameStart), int(frameEnd))])
+
+
+    def __exit__(self, excType, excValue, traceback):
+        if self.applied:
+            cmds.undoInfo(closeChunk=True)
+            cmds.undo()
+            self.applied = False
+
+            # Everything was undone, so a saved scene stays clean & later exports can still be resumed
+            if not self.wasModified:
+                cmds.file(modified=False)
+        if self.nodes and self.ranges:
+            print("Sample cache: {hits} hits, {misses} misses, {evictions} evictions, {entries} entries, {bytes} bytes".format(**self.cache.Stats()))
+        return False
+
+
+###########################################################################################################################################################################
+
+
 class AnimationClipsTable(QTableWidget):
     """ Table of the objects. Filled in with the selection by default. """
 
@@ -239,6 +1145,11 @@ class AnimationClipsTable(QTableWidget):
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.OpenContextMenu)
 
+        # Filter index over clip names, rebuilt lazily after clips change
+        self._index = NGramIndex()
+        self._indexDirty = True
+        self._filter = ""
+
     def OpenContextMenu(self, position):
         self.cursorPosition = position
         self.menu = QMenu(self)
@@ -247,12 +1158,27 @@ class AnimationClipsTable(QTableWidget):
 
         # Actions
         action = QAction("Add New Clip", self)
-        action.triggered.connect(self.AddClip)
+        action.triggered.connect(lambda : self.AddClip())
         self.menu.addAction(action)
         action = QAction("Remove Clip", self)
         action.triggered.connect(self.RemoveClip)
         self.menu.addAction(action)
 
+        # Bulk edits, on the selected rows or every visible row
+        self.menu.addSeparator()
+        action = QAction("Enable Clips", self)
+        action.triggered.connect(lambda : self.SetClipsEnabled(True))
+        self.menu.addAction(action)
+        action = QAction("Disable Clips", self)
+        action.triggered.connect(lambda : self.SetClipsEnabled(False))
+        self.menu.addAction(action)
+        action = QAction("Offset Frames...", self)
+        action.triggered.connect(self.PromptOffsetClips)
+        self.menu.addAction(action)
+        action = QAction("Rename...", self)
+        action.triggered.connect(self.PromptRenameClips)
+        self.menu.addAction(action)
+
         # Add other actions
         self.menu.popup(self.viewport().mapToGlobal(self.cursorPosition))
 
@@ -272,23 +1198,20 @@ class AnimationClipsTable(QTableWidget):
         return clipData
 
 
-    def AddClip(self):
-        """ Add new animation to table """
-        # Add row
-        rowPosition = self.rowCount()
-        self.insertRow(rowPosition)
-
+    def _SetRowWidgets(self, row, clipData):
+        """ Build the cell widgets for a row from clip data """
         # Enabled
         enabledCheck = QCheckBox()
         enabledCheck.setFixedSize(24, 24)
-        enabledCheck.setChecked(True)
+        enabledCheck.setChecked(clipData["enabled"])
         enabledCheck.setGeometry(10, 10, 24, 24)
-        self.setCellWidget(rowPosition, 0, enabledCheck)
+        self.setCellWidget(row, 0, enabledCheck)
 
         # Animation name
         name = QLineEdit()
-        name.setText("Anim0")
-        self.setCellWidget(rowPosition, 1, name)
+        name.setText(clipData["animationName"])
+        name.textChanged.connect(self._MarkIndexDirty)
+        self.setCellWidget(row, 1, name)
 
         # Frame start/end
         def CreateFrameBox():
@@ -296,30 +1219,148 @@ class AnimationClipsTable(QTableWidget):
             spinBox.setRange(-9999, 9999)
             return spinBox
         start = CreateFrameBox()
-        start.setValue(int(pm.playbackOptions(q=True, min=True)))
+        start.setValue(clipData["frameStart"])
         end = CreateFrameBox()
-        end.setValue(int(pm.playbackOptions(q=True, max=True)))
-        self.setCellWidget(rowPosition, 2, start)
-        self.setCellWidget(rowPosition, 3, end)
+        end.setValue(clipData["frameEnd"])
+        self.setCellWidget(row, 2, start)
+        self.setCellWidget(row, 3, end)
+
+
+    def AddClip(self, clipData=None):
+        """ Add new animation to table, defaulting to the playback range """
+        if not clipData:
+            clipData = {
+                "enabled": True,
+                "animationName": "Anim0",
+                "frameStart": int(pm.playbackOptions(q=True, min=True)),
+                "frameEnd": int(pm.playbackOptions(q=True, max=True))
+            }
+
+        # Add row
+        rowPosition = self.rowCount()
+        self.insertRow(rowPosition)
+        self._SetRowWidgets(rowPosition, clipData)
+        self._indexDirty = True
+        self._Refilter()
 
         # Return row position so we can read data from this row
         return rowPosition
 
 
     def AddClipsFromData(self, data):
-        # Load in clips from file string
-        for clipData in data:
-            rowPosition = self.AddClip()
-            self.cellWidget(rowPosition, 0).setChecked(clipData["enabled"])
-            self.cellWidget(rowPosition, 1).setText(clipData["animationName"])
-            self.cellWidget(rowPosition, 2).setValue(clipData["frameStart"])
-            self.cellWidget(rowPosition, 3).setValue(clipData["frameEnd"])
+        """ Load in clips as a single batch insert, without repainting per row """
+        data = list(data)
+        rowPosition = self.rowCount()
+        self.setUpdatesEnabled(False)
+        try:
+            self.setRowCount(rowPosition + len(data))
+            for i, clipData in enumerate(data):
+                self._SetRowWidgets(rowPosition + i, clipData)
+        finally:
+            self.setUpdatesEnabled(True)
+        self._indexDirty = True
+        self._Refilter()
 
 
     def RemoveClip(self):
         row = self.currentRow()
         if row != None:
             self.removeRow(row)
+            self._indexDirty = True
+
+
+    def _MarkIndexDirty(self, *args):
+        self._indexDirty = True
+
+
+    def _Refilter(self):
+        """ Keep an active filter applied after clips are added or renamed """
+        if self._filter:
+            self.Filter(self._filter)
+
+
+    def Filter(self, text):
+        """ Show only clips whose animation name contains the text """
+        self._filter = text
+        if self._indexDirty:
+            self._index.Clear()
+            for row in range(self.rowCount()):
+                self._index.Add(row, self.cellWidget(row, 1).text())
+            self._indexDirty = False
+
+        visible = self._index.Search(text)
+        self.setUpdatesEnabled(False)
+        try:
+            for row in range(self.rowCount()):
+                self.setRowHidden(row, row not in visible)
+        finally:
+            self.setUpdatesEnabled(True)
+
+
+    def TargetRows(self):
+        """ Selected rows, or every visible row if nothing is selected """
+        rows = sorted(set(index.row() for index in self.selectedIndexes()))
+        return rows or [row for row in range(self.rowCount()) if not self.isRowHidden(row)]
+
+
+    def BulkEdit(self, edit, rows=None):
+        """ Apply edit(clipData) to the clip data of the rows in one pass, then update their widgets with a single repaint """
+        rows = self.TargetRows() if rows is None else rows
+        data = self.GetData()
+        for row in rows:
+            edit(data[row])
+
+        self.setUpdatesEnabled(False)
+        try:
+            for row in rows:
+                self.cellWidget(row, 0).setChecked(data[row]["enabled"])
+                self.cellWidget(row, 1).setText(data[row]["animationName"])
+                self.cellWidget(row, 2).setValue(data[row]["frameStart"])
+                self.cellWidget(row, 3).setValue(data[row]["frameEnd"])
+        finally:
+            self.setUpdatesEnabled(True)
+        self._Refilter()
+        return rows
+
+
+    def SetClipsEnabled(self, enabled, rows=None):
+        def Edit(clip):
+            clip["enabled"] = enabled
+        return self.BulkEdit(Edit, rows)
+
+
+    def OffsetClips(self, offset, rows=None):
+        def Edit(clip):
+            clip["frameStart"] += offset
+            clip["frameEnd"] += offset
+        return self.BulkEdit(Edit, rows)
+
+
+    def RenameClips(self, pattern, replacement, rows=None):
+        """ Regex substitution over the animation names """
+        regex = re.compile(pattern)
+        def Edit(clip):
+            clip["animationName"] = regex.sub(replacement, clip["animationName"])
+        return self.BulkEdit(Edit, rows)
+
+
+    def PromptOffsetClips(self):
+        offset, ok = QInputDialog.getInt(self, "Offset Frames", "Frames to offset the clips by", 0, -9999, 9999)
+        if ok and offset != 0:
+            self.OffsetClips(offset)
+
+
+    def PromptRenameClips(self):
+        pattern, ok = QInputDialog.getText(self, "Rename Clips", "Pattern (regular expression)")
+        if not ok or len(pattern) == 0:
+            return
+        replacement, ok = QInputDialog.getText(self, "Rename Clips", "Replace with")
+        if not ok:
+            return
+        try:
+            self.RenameClips(pattern, replacement)
+        except re.error as e:
+            QMessageBox.warning(self, "Rename Clips", "Invalid pattern '{}': {}".format(pattern, e), QMessageBox.Ok)
 
 
 class AnimationTab(QDialog):
@@ -365,6 +1406,14 @@ class AnimationTab(QDialog):
         # FBX settings
         self.bakeAnimation = QCheckBox("Bake Animation", checked=True)
         vbox.addWidget(self.bakeAnimation)
+        self.cacheSamples = QCheckBox("Cache Samples", checked=False, toolTip="Key clips from cached transform samples instead of baking, the rig is only evaluated when its animation changes")
+        vbox.addWidget(self.cacheSamples)
+
+        # Filter bar
+        self.filter = QLineEdit(placeholderText="Filter clips & nodes", toolTip="Show only clips & export nodes containing this text")
+        self.filter.setFixedHeight(25)
+        self.filter.textChanged.connect(self.ApplyFilter)
+        vbox.addWidget(self.filter)
 
         # Vertical splitter
         splitter = QSplitter(self)
@@ -383,16 +1432,30 @@ class AnimationTab(QDialog):
         hbox = QHBoxLayout(alignment=Qt.AlignLeft)
         vbox.addLayout(hbox)
 
+        # Discover clips button
+        self.discoverClipsButton = QPushButton(text="Discover Clips", toolTip="Fill the clips table from scene data", icon=QIcon(":/search.png"), iconSize=QSize(25, 25))
+        self.discoverClipsButton.setFixedWidth(150)
+        discoverMenu = QMenu(self)
+        for label, discover in [("Time Slider Bookmarks", DiscoverBookmarkClips),
+                                ("Time Editor Clips", DiscoverTimeEditorClips),
+                                ("Trax Clips", DiscoverTraxClips),
+                                ("Split By Key Gaps", lambda : DiscoverKeyGapClips(self.exportNodes.GetData())),
+                                ("Split By Static Poses", lambda : DiscoverMotionClips(self.exportNodes.GetData()))]:
+            action = discoverMenu.addAction(label)
+            action.triggered.connect(lambda checked=False, discover=discover : self.DiscoverClips(discover))
+        self.discoverClipsButton.setMenu(discoverMenu)
+        hbox.addWidget(self.discoverClipsButton)
+
         # Export data button
         self.exportDataButton = QPushButton(text="Export Clips", toolTip="Export all clips rom the current tab", icon=QIcon(":/saveToShelf.png"), iconSize=QSize(25, 25))
         self.exportDataButton.setFixedWidth(150)
-        self.exportDataButton.clicked.connect(self.ExportClips)
+        self.exportDataButton.clicked.connect(lambda : self.ExportClips())
         hbox.addWidget(self.exportDataButton)
 
         # Export bind
         self.exportBindButton = QPushButton(text="Export Bind", toolTip="Export bind pose from the current tab", icon=QIcon(":/out_character.png"), iconSize=QSize(25, 25))
         self.exportBindButton.setFixedWidth(150)
-        self.exportBindButton.clicked.connect(self.ExportBind)
+        self.exportBindButton.clicked.connect(lambda : self.ExportBind())
         hbox.addWidget(self.exportBindButton)
 
 
@@ -405,6 +1468,7 @@ class AnimationTab(QDialog):
             "name": self.name.text(),
             "exportDirectory": self.exportDirectory.text(),
             "bakeAnimation": self.bakeAnimation.isChecked(),
+            "cacheSamples": self.cacheSamples.isChecked(),
             "exportNodes": self.exportNodes.GetData(),
             "clips": clipData
         }
@@ -415,10 +1479,39 @@ class AnimationTab(QDialog):
         self.name.setText(data["name"])
         self.exportDirectory.setText(data["exportDirectory"])
         self.bakeAnimation.setChecked(data["bakeAnimation"])
+        self.cacheSamples.setChecked(data.get("cacheSamples", False))
         self.animationClips.AddClipsFromData(data["clips"])
         self.exportNodes.AddNodesFromData(data["exportNodes"])
 
 
+    def ApplyFilter(self, text=None):
+        text = self.filter.text() if text is None else text
+        self.animationClips.Filter(text)
+        self.exportNodes.Filter(text)
+
+
+    def DiscoverClips(self, discover):
+        """ Fill the clips table from a discovery function in one batch, skipping clips that already exist: the same
+            range under the same name, ignoring its number. Discovered names that clash with an existing clip, such as
+            another segmenter's takes, are numbered on """
+        def Key(clip):
+            return (_clipNumber.match(clip["animationName"]).group(1).lower(), clip["frameStart"], clip["frameEnd"])
+
+        data = self.animationClips.GetData()
+        existing = set(Key(c) for c in data)
+        taken = set(c["animationName"].lower() for c in data)
+        clips = []
+        for clip in discover():
+            if Key(clip) in existing:
+                continue
+            existing.add(Key(clip))
+            clip["animationName"] = UniqueClipName(clip["animationName"], taken)
+            taken.add(clip["animationName"].lower())
+            clips.append(clip)
+        self.animationClips.AddClipsFromData(clips)
+        print("{}: Discovered {} clips".format(self.name.text(), len(clips)))
+
+
     def UpdateParentTabWidget(self):
         assert(self.tabWidget != None or self.tabIndex >= 0)
         self.tabWidget.setTabText(self.tabIndex, self.name.text())
@@ -430,23 +1523,42 @@ class AnimationTab(QDialog):
             self.exportDirectory.setText(filename)
 
 
-    def ExportClips(self):
+    def GetClipFilename(self, clip):
+        return os.path.join(self.exportDirectory.text(), "{0}_{1}_ANIM.fbx".format(self.name.text(), clip["animationName"]))
+
+
+    def ExportClips(self, journal=None, sceneStamp=None):
+        """ Export every enabled clip. With a journal each clip is checkpointed, failures are recorded & skipped past,
+            and clips the journal has already finished are skipped when resuming. Batches pass the scene stamp they
+            took before exporting anything """
         assert (self.animationClips.rowCount() != 0 or self.exportNodes.invisibleRootItem().childCount() != 0), "No clips to export"
         print("Exporting clips from '{}'..".format(self.name.text()))
+        if journal and sceneStamp is None:
+            sceneStamp = GetSceneStamp()
+
+        # Validate clips before touching the scene
+        clips = self.animationClips.GetData()
+        validation = ValidateClips(clips)
+        for warning in validation.warnings:
+            print("{}: Warning: {}".format(self.name.text(), warning))
+        if not validation.IsValid():
+            for error in validation.errors:
+                print("{}: Error: {}".format(self.name.text(), error))
+            if journal:
+                # Batches carry on to the next tab, so the clips are recorded as failed instead of blocking on a dialog
+                for clip in clips:
+                    if clip["enabled"]:
+                        journal.Record(self.GetClipFilename(clip), None, status="failed")
+                print("{}: Failed to export clips, they are invalid".format(self.name.text()))
+                return
+            QMessageBox.critical(self, "Invalid Clips", "Cannot export clips from '{}':\n{}".format(self.name.text(), "\n".join(validation.errors)), QMessageBox.Ok)
+            return
+        print("{}: {} clip frames cover {} unique frames in {} ranges".format(self.name.text(), validation.clipFrames, validation.UnionFrames(), len(validation.ranges)))
 
-        selection = cmds.ls(sl=True) # Cache selection
-        pm.select(clear=True) # Clear it
-        minTime = cmds.playbackOptions(minTime=True, query=True)
-        maxTime = cmds.playbackOptions(maxTime=True, query=True)
-
-        # Select nodes to export
-        root = self.exportNodes.invisibleRootItem()
-        for i in range(root.childCount()):
-            item = root.child(i)
-            longname = item.text(1)
-            pyNode = pm.PyNode(longname)
-            if pyNode.nodeType != u'mesh': # Ignore mesh types
-                cmds.select(longname, add=True)
+        # Nodes to export, ignoring meshes. The tree holds transforms, so they're typed by their first shape
+        nodes = self.exportNodes.GetData()
+        nodeTypes = GetNodeTypes(nodes) if nodes else {}
+        nodes = [n for n in nodes if nodeTypes.get(n) != "mesh"]
 
         # Set base FBX settings
         pm.mel.FBXExportTangents(v=False)
@@ -458,53 +1570,69 @@ class AnimationTab(QDialog):
         pm.mel.FBXExportAnimationOnly(v=False)
         pm.mel.FBXExportInputConnections(v=False)
 
-        # Export each clip
+        # Clips to export, skipping clips already exported with the same inputs before anything is selected or sampled
         directory = self.exportDirectory.text()
-        for row in range(self.animationClips.rowCount()):
+        name = self.name.text()
+        tabSettings = {"name": name, "exportDirectory": directory, "bakeAnimation": self.bakeAnimation.isChecked(), "exportNodes": nodes}
+        exports = []
+        for clip in clips:
             # If disabled clip, ignore and continue to next clip
-            if not self.animationClips.cellWidget(row, 0).isChecked():
+            if not clip["enabled"]:
                 continue
 
             # Get filename
-            name = self.name.text()
-            animationName = self.animationClips.cellWidget(row, 1).text()
-            filename = os.path.join(directory, "{0}_{1}_ANIM.fbx".format(name, animationName))
-
-            # Set frame range
-            frameStart = self.animationClips.cellWidget(row, 2).value()
-            frameEnd = self.animationClips.cellWidget(row, 3).value()
-            cmds.playbackOptions(minTime=frameStart, maxTime=frameEnd)
-
-            # Set FBX options
-            pm.mel.FBXExportBakeComplexStart(v=frameStart)
-            pm.mel.FBXExportBakeComplexEnd(v=frameEnd)
-            pm.mel.FBXExportBakeComplexAnimation(v=self.bakeAnimation.isChecked())
-
-            # Export
-            pm.mel.FBXExport(f=filename, s=True)
-
-            # Success
-            print("{}: Exported clip '{}' to '{}' from frame {} to {}".format(name, animationName, filename, frameStart, frameEnd))
-
-
-        # Restore selection
-        pm.select(selection)
-        # Restore frame range
-        cmds.playbackOptions(minTime=minTime, maxTime=maxTime)
-
+            filename = self.GetClipFilename(clip)
+            inputsHash = HashExportInputs(sceneStamp, tabSettings, clip) if journal else None
+            if journal and journal.IsDone(filename, inputsHash):
+                print("{}: Skipped clip '{}', already exported to '{}'".format(name, clip["animationName"], filename))
+                continue
+            exports.append((clip, filename, inputsHash))
+        if not exports:
+            print("{}: No clips left to export".format(name))
+            return
 
-    def ExportBind(self):
+        # Export each clip, when baking the range comes from the FBX options so the playback range is left alone.
+        # Optionally key the nodes from cached samples per clip instead of baking, so the rig is only evaluated on a cache miss
+        cachedNodes = nodes if self.bakeAnimation.isChecked() and self.cacheSamples.isChecked() else []
+        with ExportSession(nodes) as session, CachedSampleBake(cachedNodes, [clip for clip, filename, inputsHash in exports]) as samples:
+            for clip, filename, inputsHash in exports:
+                animationName = clip["animationName"]
+
+                # Set FBX options
+                frameStart = clip["frameStart"]
+                frameEnd = clip["frameEnd"]
+                pm.mel.FBXExportBakeComplexStart(v=frameStart)
+                pm.mel.FBXExportBakeComplexEnd(v=frameEnd)
+                bake = self.bakeAnimation.isChecked() and not samples.applied
+                pm.mel.FBXExportBakeComplexAnimation(v=bake)
+                if samples.applied:
+                    samples.Apply(frameStart, frameEnd)
+
+                # Without baking the FBX time span comes from the time slider, the session restores it on exit
+                if not bake:
+                    cmds.playbackOptions(minTime=frameStart, maxTime=frameEnd)
+
+                # Export
+                try:
+                    session.Export(filename)
+                except Exception as e:
+                    if not journal:
+                        raise
+                    journal.Record(filename, inputsHash, status="failed")
+                    print("{}: Failed to export clip '{}': {}".format(name, animationName, e))
+                    continue
+                if journal:
+                    journal.Record(filename, inputsHash)
+
+                # Success
+                print("{}: Exported clip '{}' to '{}' from frame {} to {}".format(name, animationName, filename, frameStart, frameEnd))
+
+
+    def ExportBind(self, journal=None, sceneStamp=None):
+        """ Export the bind pose. With a journal the export is checkpointed & skipped when resuming if already done """
         print("Exporting bind from '{}'..".format(self.name.text()))
-
-        selection = cmds.ls(sl=True) # Cache selection
-        pm.select(clear=True) # Clear it
-
-        # Select nodes to export
-        root = self.exportNodes.invisibleRootItem()
-        for i in range(root.childCount()):
-            item = root.child(i)
-            longname = item.text(1)
-            cmds.select(longname, add=True)
+        if journal and sceneStamp is None:
+            sceneStamp = GetSceneStamp()
 
         # Set base FBX settings
         try:
@@ -529,16 +1657,349 @@ class AnimationTab(QDialog):
         name = self.name.text()
         filename = os.path.join(directory, name + "_SK.fbx")
 
-        # Export
-        pm.mel.FBXExport(f=filename, s=True)
+        # Skip if already exported with the same inputs
+        nodes = self.exportNodes.GetData()
+        inputsHash = HashExportInputs(sceneStamp, {"name": name, "exportDirectory": directory, "exportNodes": nodes}) if journal else None
+        if journal and journal.IsDone(filename, inputsHash):
+            print("Skipped bind from '{}', already exported to '{}'".format(name, filename))
+            return
 
-        # Restore selection
-        pm.select(selection)
+        # Export, no baking so evaluation mode is left alone
+        try:
+            with ExportSession(nodes, evaluationMode=None) as session:
+                session.Export(filename)
+        except Exception as e:
+            if not journal:
+                raise
+            journal.Record(filename, inputsHash, status="failed")
+            print("Failed to export bind from '{}': {}".format(name, e))
+            return
+        if journal:
+            journal.Record(filename, inputsHash)
 
         # Success
         print("Exported bind from '{}' to '{}'".format(name, filename))
 
 
+############################################################################### SKIN WEIGHTS #############################################################################
+
+
+def GetSkinWeightsData(object):
+    """ Gather skin weight data for an object from its live skinCluster """
+    skin = mel.eval("findRelatedSkinCluster {}".format(object))
+
+    numVertices = cmds.polyEvaluate(object, v=True)
+    d = {"object": object, "numVertices": numVertices, "skinCluster": skin, "positions": GetVertexPositions(object), "vertices": []}
+    if skin:
+        for i in range(0, numVertices):
+            vtx = (object + ".vtx[{}]").format(i)
+
+            newData = []
+            joints = cmds.skinPercent(skin, vtx, query=True, transform=None) or []
+            weights = cmds.skinPercent(skin, vtx, query=True, v=True) or []
+            for idx, j in enumerate(joints):
+                newData.append( (j, weights[idx]) )
+            d["vertices"].append(newData)
+    return d
+
+
+def GetVertexPositions(object):
+    """ World space positions of every vertex as a flat [x, y, z, ...] list, gathered in a single query """
+    return cmds.xform("{}.vtx[*]".format(object), query=True, worldSpace=True, translation=True) or []
+
+
+def SkinWeightsToArray(vertices, influences=None):
+    """ Convert per-vertex (joint, weight) lists to an influence list & a dense (numVertices, numInfluences) weight array.
+        Passing influences keeps their column order, any joints not in it are appended """
+    assert np is not None, "numpy is required for skin weight arrays"
+
+    influences = list(influences or [])
+    columns = dict((joint, col) for col, joint in enumerate(influences))
+    rows, cols, values = [], [], []
+    for idx, vertex in enumerate(vertices or []):
+        for joint, weight in vertex:
+            col = columns.get(joint)
+            if col is None:
+                col = columns[joint] = len(influences)
+                influences.append(joint)
+            rows.append(idx)
+            cols.append(col)
+            values.append(weight)
+
+    weights = np.zeros((len(vertices or []), len(influences)))
+    np.add.at(weights, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), values)
+    return influences, weights
+
+
+def ArrayToSkinWeights(influences, weights, tolerance=0.0):
+    """ Convert a dense weight array back to per-vertex (joint, weight) lists, dropping weights at or below the tolerance """
+    assert np is not None, "numpy is required for skin weight arrays"
+
+    rows, cols = np.nonzero(weights > tolerance)
+    values = weights[rows, cols].tolist()
+    joints = [influences[c] for c in cols.tolist()]
+    splits = np.cumsum(np.bincount(rows, minlength=len(weights)))[:-1].tolist()
+
+    vertices = []
+    start = 0
+    for end in splits + [len(values)]:
+        vertices.append(list(zip(joints[start:end], values[start:end])))
+        start = end
+    return vertices
+
+
+class SpatialGrid(object):
+    """ Uniform grid over a point cloud, for bulk nearest-neighbour queries """
+
+    _offsets = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]
+
+    def __init__(self, points, pointsPerCell=2.0):
+        assert np is not None, "numpy is required for the spatial grid"
+
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        assert len(self.points) > 0, "Cannot build a spatial grid from no points"
+
+        # Size cells from the occupied axes only, so flat meshes don't collapse to zero-sized cells
+        self.origin = self.points.min(axis=0)
+        extent = self.points.max(axis=0) - self.origin
+        axes = extent > max(extent.max(), 1e-6) * 1e-3
+        if axes.any():
+            self.cellSize = float((np.prod(extent[axes]) * pointsPerCell / len(self.points)) ** (1.0 / axes.sum()))
+        else:
+            self.cellSize = 1.0
+        self.cellSize = max(self.cellSize, 1e-6)
+
+        # Mesh vertices lie on a surface rather than filling the volume, so shrink cells until occupancy is close to the target.
+        # Coincident vertices share a cell at any size, so occupancy counts distinct positions
+        numDistinct = len(np.unique(self.points, axis=0))
+        for i in range(4):
+            self.dims = (extent // self.cellSize).astype(np.int64) + 1
+            keys = self._Keys(self._Cells(self.points))
+            occupancy = numDistinct / float(len(np.unique(keys)))
+            if occupancy < pointsPerCell * 2.0:
+                break
+            self.cellSize *= (pointsPerCell / occupancy) ** 0.5
+        else:
+            # Still shrinking after the last pass, the keys must match the final cell size
+            self.dims = (extent // self.cellSize).astype(np.int64) + 1
+            keys = self._Keys(self._Cells(self.points))
+
+        # Sort points by cell key so each occupied cell is a contiguous run
+        self.order = np.argsort(keys, kind="mergesort")
+        self.cellKeys, self.cellStarts, self.cellCounts = np.unique(keys[self.order], return_index=True, return_counts=True)
+
+
+    def _Cells(self, points):
+        return np.floor((points - self.origin) / self.cellSize).astype(np.int64)
+
+
+    def _Keys(self, cells):
+        return cells[:, 0] + self.dims[0] * (cells[:, 1] + self.dims[1] * cells[:, 2])
+
+
+    def Query(self, queries):
+        """ Find the nearest point for every query point, returns (indices, distances) """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        numQueries = len(queries)
+
+        # Visit queries in cell order to keep the lookups coherent
+        cells = self._Cells(queries)
+        queryOrder = np.argsort(self._Keys(cells), kind="mergesort")
+        queries = queries[queryOrder]
+        cells = cells[queryOrder]
+        bestDistance = np.full(numQueries, np.inf)
+        bestIndex = np.full(numQueries, -1, dtype=np.int64)
+
+        # Search the 3x3x3 block of cells around each query
+        for offset in self._offsets:
+            neighbours = cells + offset
+            valid = np.all((neighbours >= 0) & (neighbours < self.dims), axis=1)
+            keys = self._Keys(neighbours)
+            cellIndex = np.minimum(np.searchsorted(self.cellKeys, keys), len(self.cellKeys) - 1)
+            valid &= self.cellKeys[cellIndex] == keys
+            starts = self.cellStarts[cellIndex]
+            counts = np.where(valid, self.cellCounts[cellIndex], 0)
+            total = int(counts.sum())
+            if total == 0:
+                continue
+
+            # Flatten every (query, candidate) pair
+            queryIndex = np.repeat(np.arange(numQueries), counts)
+            runOffsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            candidates = self.order[starts[queryIndex] + runOffsets]
+            delta = self.points[candidates] - queries[queryIndex]
+            distances = np.einsum("ij,ij->i", delta, delta)
+
+            # Closest candidate per query, pairs are already grouped by query
+            groupStarts = np.flatnonzero(np.concatenate(([True], np.diff(queryIndex) != 0)))
+            groupSizes = np.diff(np.append(groupStarts, total))
+            groupMin = np.minimum.reduceat(distances, groupStarts)
+            better = groupMin < bestDistance[queryIndex[groupStarts]]
+            hits = np.flatnonzero((distances == np.repeat(groupMin, groupSizes)) & np.repeat(better, groupSizes))
+            bestDistance[queryIndex[hits]] = distances[hits]
+            bestIndex[queryIndex[hits]] = candidates[hits]
+
+        # Anything further than one cell away may have a closer point outside the searched block, brute force those
+        missing = np.flatnonzero(~(bestDistance <= self.cellSize * self.cellSize))
+        chunkSize = max(1, (1 << 22) // len(self.points))
+        pointsSq = np.einsum("ij,ij->i", self.points, self.points)
+        for i in range(0, len(missing), chunkSize):
+            chunk = missing[i:i + chunkSize]
+            distances = pointsSq[None, :] - 2.0 * queries[chunk].dot(self.points.T) + np.einsum("ij,ij->i", queries[chunk], queries[chunk])[:, None]
+            nearest = distances.argmin(axis=1)
+            bestIndex[chunk] = nearest
+            bestDistance[chunk] = np.maximum(distances[np.arange(len(chunk)), nearest], 0.0)
+
+        # Back to the caller's order
+        indices = np.empty(numQueries, dtype=np.int64)
+        indices[queryOrder] = bestIndex
+        distances = np.empty(numQueries)
+        distances[queryOrder] = np.sqrt(bestDistance)
+        return indices, distances
+
+
+def FlattenSkinWeights(vertices):
+    """ Flatten per-vertex (joint, weight) lists to (offsets, joints, weights) arrays, vertex i's entries running from
+        offsets[i] to offsets[i + 1]. Keeps every entry as it is, unlike the dense SkinWeightsToArray """
+    assert np is not None, "numpy is required for skin weight arrays"
+
+    offsets = np.zeros(len(vertices) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(vertex) for vertex in vertices])
+    joints = np.array([joint for vertex in vertices for joint, weight in vertex], dtype=object)
+    weights = np.array([weight for vertex in vertices for joint, weight in vertex], dtype=np.float64)
+    return offsets, joints, weights
+
+
+def UnflattenSkinWeights(offsets, joints, weights):
+    """ Per-vertex (joint, weight) lists from FlattenSkinWeights arrays """
+    pairs = list(zip(joints.tolist(), weights.tolist()))
+    bounds = offsets.tolist()
+    return [pairs[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def GatherSkinWeights(offsets, joints, weights, indices):
+    """ Flattened skin weights of the vertices at indices, in their order, without looping over vertices """
+    counts = np.diff(offsets)[indices]
+    gathered = np.zeros(len(counts) + 1, dtype=np.int64)
+    gathered[1:] = np.cumsum(counts)
+    entries = np.repeat(offsets[:-1][indices] - gathered[:-1], counts) + np.arange(gathered[-1])
+    return gathered, joints[entries], weights[entries]
+
+
+def RemapSkinWeightsByPosition(data, targetPositions):
+    """ Remap exported skin weight data onto a target mesh by nearest source vertex position """
+    assert len(data.get("positions") or []) > 0, "No vertex positions stored for '{}', re-export the skin weights".format(data.get("object"))
+
+    nearest, distances = SpatialGrid(data["positions"]).Query(targetPositions)
+    return UnflattenSkinWeights(*GatherSkinWeights(*FlattenSkinWeights(data["vertices"]), indices=nearest))
+
+
+SKIN_WEIGHTS_PATCH = "skinWeightsPatch"
+
+
+SKIN_WEIGHTS_FILTER = "JSON (*.json *.json.gz)"
+
+
+def LoadSkinWeightsFile(filename):
+    """ Read skin weight data or a skin weights patch from a json file, gzip compressed if it ends in .gz """
+    opener = gzip.open if filename.endswith(".gz") else open
+    with opener(filename, "rb") as inFile:
+        return json.loads(inFile.read().decode("utf-8"))
+
+
+def WriteSkinWeightsFile(filename, data):
+    """ Write skin weight data as json, gzip compressed if it ends in .gz. Without indentation json uses its C encoder """
+    opener = gzip.open if filename.endswith(".gz") else open
+    with opener(filename, "wb") as outFile:
+        outFile.write(json.dumps(data).encode("utf-8"))
+
+
+def EncodeSkinWeights(d, prefix="", suffix="", compress=False):
+    """ Encode one object's skin weight data as its piece of the file's json list, run on worker threads. Compressed
+        pieces are gzip members of their own, which concatenate into a valid .gz file. zlib releases the GIL, so this
+        overlaps with gathering the next object """
+    encoded = (prefix + json.dumps(d) + suffix).encode("utf-8")
+    if compress:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        encoded = compressor.compress(encoded) + compressor.flush()
+    return encoded
+
+
+def WriteEncodedSkinWeights(outFile, job):
+    """ Write an object's piece once its encode job finishes, run on a single writer thread so pieces stay in order """
+    outFile.write(job.get())
+
+
+def NormalizeSkinWeights(offsets, weights):
+    """ Rescale each vertex's flattened weights to sum to one, every vertex at once. Vertices without weight are kept """
+    rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    totals = np.bincount(rows, weights=weights, minlength=len(offsets) - 1)
+    totals[totals <= 0] = 1.0
+    return weights / totals[rows]
+
+
+def PrepareSkinWeights(d, targetPositions=None):
+    """ CPU side of an import, run on worker threads. Remaps by position if target positions are given & normalizes,
+        vectorized over every vertex. Returns (vertex index, influences) pairs ready to apply """
+    assert np is not None, "numpy is required to import skin weights"
+
+    offsets, joints, weights = FlattenSkinWeights(d["vertices"] or [])
+    indices = d.get("indices") or range(len(offsets) - 1)
+    if targetPositions is not None:
+        assert len(d.get("positions") or []) > 0, "No vertex positions stored for '{}', re-export the skin weights".format(d.get("object"))
+        nearest, distances = SpatialGrid(d["positions"]).Query(targetPositions)
+        offsets, joints, weights = GatherSkinWeights(offsets, joints, weights, nearest)
+        indices = range(len(nearest))
+    return list(zip(indices, UnflattenSkinWeights(offsets, joints, NormalizeSkinWeights(offsets, weights))))
+
+
+def CreateSkinWeightsPool(numJobs):
+    """ Thread pool for skin weight jobs, Maya commands must stay on the main thread """
+    return ThreadPool(processes=max(1, min(numJobs, cpu_count())))
+
+
+def ReportSkinWeightsThroughput(action, numMeshes, numVertices, elapsed):
+    elapsed = max(elapsed, 1e-6)
+    print("{} {} meshes ({} vertices) in {:.2f}s: {:.1f} meshes/s, {:.0f} vertices/s".format(action, numMeshes, numVertices, elapsed, numMeshes / elapsed, numVertices / elapsed))
+
+
+def DiffSkinWeights(base, current, tolerance=1e-4):
+    """ Compare two lists of skin weight data, returning a patch holding only the vertices whose weights changed by more than the tolerance """
+    assert np is not None, "numpy is required to diff skin weights"
+
+    patch = {"type": SKIN_WEIGHTS_PATCH, "tolerance": tolerance, "objects": []}
+    baseObjects = dict((d["object"], d) for d in base or [])
+
+    for d in current or []:
+        influences, weights = SkinWeightsToArray(d["vertices"])
+        b = baseObjects.get(d["object"])
+
+        if b is None or len(b["vertices"] or []) != len(d["vertices"] or []):
+            # New object or changed topology, indices can't be compared so the whole object goes in the patch
+            changed = np.arange(len(weights))
+        else:
+            # Align both to the same influence columns & compare every vertex at once
+            influences, baseWeights = SkinWeightsToArray(b["vertices"], influences)
+            weights = np.pad(weights, ((0, 0), (0, len(influences) - weights.shape[1])), "constant")
+            changed = np.flatnonzero(np.abs(weights - baseWeights).max(axis=1, initial=0.0) > tolerance)
+
+        if len(changed) > 0:
+            patch["objects"].append({
+                "object": d["object"],
+                "numVertices": d["numVertices"],
+                "skinCluster": d["skinCluster"],
+                "indices": changed.tolist(),
+                "vertices": ArrayToSkinWeights(influences, weights[changed])
+            })
+
+    return patch
+
+
+def DiffSkinWeightsFiles(baseFilename, filename, tolerance=1e-4):
+    """ Diff two exported skin weight files """
+    return DiffSkinWeights(LoadSkinWeightsFile(baseFilename), LoadSkinWeightsFile(filename), tolerance)
+
+
 
 
 ###########################################################################################################################################################################
@@ -620,14 +2081,24 @@ class AnimationExporterWindow(QMainWindow):
 
         # Export all tab clips button
         self.exportAllTabs = QToolButton(toolTip="Export clips from all tabs", icon=QIcon(":/writeToVectorBuffer.svg"))
-        self.exportAllTabs.clicked.connect(self.ExportAllTabs)
+        self.exportAllTabs.clicked.connect(lambda : self.ExportAllTabs())
         toolbar.addWidget(self.exportAllTabs)
 
+        # Resume export all tab clips button
+        self.resumeExportAllTabs = QToolButton(toolTip="Resume exporting clips from all tabs, skipping clips already exported", icon=QIcon(":/timeplay.png"))
+        self.resumeExportAllTabs.clicked.connect(lambda : self.ExportAllTabs(resume=True))
+        toolbar.addWidget(self.resumeExportAllTabs)
+
         # Export all tab clips button
         self.exportBindsAllTabs = QToolButton(toolTip="Export bind poses from all tabs", icon=QIcon(":/QR_QuickRigTool.png"))
-        self.exportBindsAllTabs.clicked.connect(self.ExportBindsAllTabs)
+        self.exportBindsAllTabs.clicked.connect(lambda : self.ExportBindsAllTabs())
         toolbar.addWidget(self.exportBindsAllTabs)
 
+        # Resume export all tab binds button
+        self.resumeExportBindsAllTabs = QToolButton(toolTip="Resume exporting bind poses from all tabs, skipping binds already exported", icon=QIcon(":/timeplay.png"))
+        self.resumeExportBindsAllTabs.clicked.connect(lambda : self.ExportBindsAllTabs(resume=True))
+        toolbar.addWidget(self.resumeExportBindsAllTabs)
+
 
         # Animation tabs
         self.animationTabWidget = QTabWidget()
@@ -662,6 +2133,7 @@ class AnimationExporterWindow(QMainWindow):
     def closeEvent(self, *args, **kwargs):
         """ Kill jobs, save geo, save clips """
         self.Save()
+        DisposeExportSetResolver()
 
         # Create ini file if it doesn't exist
         if not os.path.exists(self.uiSettingsIni):
@@ -709,7 +2181,7 @@ class AnimationExporterWindow(QMainWindow):
     def _LoadFromData(self, data=None):
         assert(data != None)
 
-        for tabData in data["tabs"] or []:
+        for tabData in data.get("tabs") or []:
 
             # Find existing tabs and overwrite them to avoid duplicates
             found = False
@@ -790,18 +2262,24 @@ class AnimationExporterWindow(QMainWindow):
         item.ExportClips()
 
 
-    def ExportAllTabs(self):
-        # For each tab
-        for i in range(self.animationTabWidget.count()):
-            item = self.animationTabWidget.widget(i)
-            item.ExportClips()
+    def ExportAllTabs(self, resume=False):
+        """ Export clips from every tab, checkpointing each clip. Resuming skips clips finished by a previous run """
+        sceneStamp = GetSceneStamp()
+        with ExportJournal(GetExportJournalFilename(), resume=resume) as journal:
+            # For each tab
+            for i in range(self.animationTabWidget.count()):
+                item = self.animationTabWidget.widget(i)
+                item.ExportClips(journal, sceneStamp)
 
 
-    def ExportBindsAllTabs(self):
-        # For each tab
-        for i in range(self.animationTabWidget.count()):
-            item = self.animationTabWidget.widget(i)
-            item.ExportBind()
+    def ExportBindsAllTabs(self, resume=False):
+        """ Export bind poses from every tab, checkpointing each bind. Resuming skips binds finished by a previous run """
+        sceneStamp = GetSceneStamp()
+        with ExportJournal(GetExportJournalFilename(), resume=resume) as journal:
+            # For each tab
+            for i in range(self.animationTabWidget.count()):
+                item = self.animationTabWidget.widget(i)
+                item.ExportBind(journal, sceneStamp)
 
 
     def ExportSkinWeights(self):
@@ -819,9 +2297,9 @@ class AnimationExporterWindow(QMainWindow):
             return
 
         # Get directory to save to
-        filename = QFileDialog.getSaveFileName(self, "Export Skin Weights Data", dir=self._filename, filter=("JSON (*.json)"))[0]
+        filename = QFileDialog.getSaveFileName(self, "Export Skin Weights Data", dir=self._filename, filter=SKIN_WEIGHTS_FILTER)[0]
         # Validate directory
-        if len(self._filename) < 1:
+        if len(filename) < 1:
             print("File invalid")
             ret = QMessageBox.critical(self, self.tr("Warning"),
                                       self.tr("File invalid."),
@@ -830,46 +2308,77 @@ class AnimationExporterWindow(QMainWindow):
         else:
             self._filename = filename
 
-        # Init data
-        data = []
+        # Gather each object on the main thread while earlier objects encode, compress & write in the background
+        start = time.time()
+        numVertices = 0
+        compress = self._filename.endswith(".gz")
+        pool = CreateSkinWeightsPool(len(selected))
+        writer = CreateSkinWeightsPool(1)
+        try:
+            with open(self._filename, "wb") as outFile:
+                writes = []
+                for i, s in enumerate(selected):
+                    d = GetSkinWeightsData(s)
+                    numVertices += d["numVertices"]
+                    prefix = "[" if i == 0 else ","
+                    suffix = "]" if i == len(selected) - 1 else ""
+                    job = pool.apply_async(EncodeSkinWeights, (d, prefix, suffix, compress))
+                    writes.append(writer.apply_async(WriteEncodedSkinWeights, (outFile, job)))
+                for write in writes:
+                    write.get()
+        finally:
+            pool.close()
+            writer.close()
+
+        print("Exported skin weights to '{}'".format(self._filename))
+        ReportSkinWeightsThroughput("Exported", len(selected), numVertices, time.time() - start)
+        message = QMessageBox()
+        message.setText("Successfully exported skin weights")
+        message.setStandardButtons(QMessageBox.Ok)
+        message.exec_()
 
-        # For each selected object
-        for s in selected:
-            skin = mel.eval("findRelatedSkinCluster {}".format(s))
 
-            numVertices = cmds.polyEvaluate(v=True)
-            d = {"object": s, "numVertices": numVertices, "skinCluster": skin, "vertices": []}
-            if skin:
-                influences = cmds.skinCluster(skin, query=True, inf=True)
-                for i in range(0, numVertices):
-                    vtx = (s + ".vtx[{}]").format(i)
+    def ExportSkinWeightsPatch(self, tolerance=1e-4):
+        """ Diff the live skin weights against a previously exported file & export only the changed vertices """
 
-                    newData = []
-                    joints = cmds.skinPercent(skin, vtx, query=True, transform=None) or []
-                    weights = cmds.skinPercent(skin, vtx, query=True, v=True) or []
-                    for idx, j in enumerate(joints):
-                        newData.append( (j, weights[idx]) )
-                    d["vertices"].append(newData)
-            data.append(d)
+        # Get objects from table
+        selected = self.objectTable.GetObjects()
+        if len(selected) < 1:
+            print("No objects to export")
+            QMessageBox.warning(self, self.tr("Warning"), self.tr("No objects to export."), QMessageBox.Ok)
+            return
 
+        # Base file to diff against & patch file to write
+        baseFilename = QFileDialog.getOpenFileName(self, "Base Skin Weights Data", dir=self._filename, filter=SKIN_WEIGHTS_FILTER)[0]
+        if len(baseFilename) < 1 or not os.path.exists(baseFilename):
+            print("File invalid")
+            QMessageBox.critical(self, self.tr("Warning"), self.tr("File invalid."), QMessageBox.Ok)
+            return
+        base, extension = baseFilename.rsplit(".json", 1) if ".json" in baseFilename else (baseFilename, "")
+        filename = QFileDialog.getSaveFileName(self, "Export Skin Weights Patch", dir=base + "_Patch.json" + extension, filter=SKIN_WEIGHTS_FILTER)[0]
+        if len(filename) < 1:
+            return
 
-        with open(self._filename, "w") as outFile:
-            json.dump(data, outFile, indent=4)
+        # Diff against live data
+        patch = DiffSkinWeights(LoadSkinWeightsFile(baseFilename), [GetSkinWeightsData(s) for s in selected], tolerance)
+        WriteSkinWeightsFile(filename, patch)
 
-        print("Exported skin weights to '{}'".format(file))
+        numChanged = sum(len(d["indices"]) for d in patch["objects"])
+        msgStr = "Exported skin weights patch with {} changed vertices to '{}'".format(numChanged, filename)
+        print(msgStr)
         message = QMessageBox()
-        message.setText("Successfully exported skin weights")
+        message.setText(msgStr)
         message.setStandardButtons(QMessageBox.Ok)
         message.exec_()
 
 
-    def ImportSkinWeights(self):
-        """ Import skin weight data from json file """
+    def ImportSkinWeights(self, byPosition=False):
+        """ Import skin weight data or a skin weights patch from json file, matching vertices by index or by nearest position """
 
         # Get directory to save to
-        filename = QFileDialog.getOpenFileName(self, "Import Skin Weights Data", dir=self._filename, filter=("JSON (*.json)"))[0]
+        filename = QFileDialog.getOpenFileName(self, "Import Skin Weights Data", dir=self._filename, filter=SKIN_WEIGHTS_FILTER)[0]
         # Validate directory
-        if len(self._filename) < 1:
+        if len(filename) < 1:
             print("File invalid")
             ret = QMessageBox.critical(self, self.tr("Warning"),
                                        self.tr("File invalid."),
@@ -878,41 +2387,46 @@ class AnimationExporterWindow(QMainWindow):
         else:
             self._filename = filename
 
-        # Init data
-        data = []
-        # Import data from file
-        with open(self._filename) as inFile:
-            data = json.load(inFile)
-
+        start = time.time()
+        numVertices = 0
+        pool = None
         cmds.undoInfo(openChunk=True)
-        cmds.select(cl=True)
-        for d in data or []:
-            s = d["object"]
-            skin = mel.eval("findRelatedSkinCluster {}".format(s))
-
-            if skin != None:
-                for idx, vertex in enumerate(d["vertices"] or []):
-                    influences = []
-                    for inf in vertex:
-                        joint = inf[0]
-                        weight = inf[1]
-                        influences.append( (joint, weight) )
-
-                        #if unicode(joint) not in cmds.skinCluster(skin, query=True, inf=True):
-                        #cmds.select(s, replace=True)
-                        #cmds.skinCluster(skin, edit=True, addInfluence=unicode(joint))#, normalizeWeights=True, forceNormalizeWeights=True)
-
-
+        try:
+            # Patches only carry the changed vertices
+            data = LoadSkinWeightsFile(self._filename)
+            isPatch = isinstance(data, dict) and data.get("type") == SKIN_WEIGHTS_PATCH
+            if isPatch:
+                data = data["objects"]
+
+            # Queue remapping & normalization per object, only the Maya queries happen here
+            pool = CreateSkinWeightsPool(len(data or []))
+            jobs = []
+            for d in data or []:
+                s = d["object"]
+                skin = mel.eval("findRelatedSkinCluster {}".format(s))
+                if skin == None:
+                    continue
+                targetPositions = GetVertexPositions(s) if byPosition and not isPatch else None
+                jobs.append((s, skin, pool.apply_async(PrepareSkinWeights, (d, targetPositions))))
+
+            # Apply on the main thread as each object's job finishes, later objects keep processing meanwhile
+            cmds.select(cl=True)
+            for s, skin, job in jobs:
+                vertices = job.get()
+                numVertices += len(vertices)
+                for idx, influences in vertices:
                     vtx = s + ".vtx[{}]".format(idx)
                     cmds.skinPercent(skin, vtx, transformValue=influences)
-
-            cmds.select(s)
-
-        cmds.undoInfo(closeChunk=True)
+                cmds.select(s)
+        finally:
+            if pool is not None:
+                pool.close()
+            cmds.undoInfo(closeChunk=True)
 
         # Success message
         msgStr = "Imported skin weights from '{}'".format(self._filename)
         print(msgStr)
+        ReportSkinWeightsThroughput("Imported", len(jobs), numVertices, time.time() - start)
         message = QMessageBox()
         message.setText(msgStr)
         message.setStandardButtons(QMessageBox.Ok)
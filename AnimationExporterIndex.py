@@ -0,0 +1,365 @@
+"""
+Cross-scene index of Animation Exporter data, built without Maya.
+
+Scans a project tree in parallel for Maya ASCII scenes & *_Metadata.json sidecars, reads the AnimationExporterData
+file info straight from the .ma header, and keeps it in an SQLite index that's updated incrementally by mtime & hash.
+
+    python AnimationExporterIndex.py scan <ProjectDir>
+    python AnimationExporterIndex.py clips "Run*"
+    python AnimationExporterIndex.py nodes "*|pelvis"
+    python AnimationExporterIndex.py scenes --clip Run --node pelvis
+"""
+
+__author__  = 'Calvin Simpson'
+__company__ = 'The Multiplayer Guys'
+
+
+###########################################################################################################################################################################
+
+
+import argparse, hashlib, json, os, re, sqlite3, sys, time
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+
+###########################################################################################################################################################################
+
+
+FILE_INFO_KEY = "AnimationExporterData"
+METADATA_SUFFIX = "_Metadata.json"
+SCENE_EXTENSIONS = (".ma", ".mb")
+
+SCHEMA = """
+PRAGMA foreign_keys = ON;
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    scene TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT,
+    error TEXT,
+    indexed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tabs (
+    id INTEGER PRIMARY KEY,
+    file INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    exportDirectory TEXT,
+    bakeAnimation INTEGER
+);
+CREATE TABLE IF NOT EXISTS clips (
+    tab INTEGER NOT NULL REFERENCES tabs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    frameStart INTEGER,
+    frameEnd INTEGER,
+    enabled INTEGER
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    tab INTEGER NOT NULL REFERENCES tabs(id) ON DELETE CASCADE,
+    longName TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS filesScene ON files(scene);
+CREATE INDEX IF NOT EXISTS tabsFile ON tabs(file);
+CREATE INDEX IF NOT EXISTS clipsTab ON clips(tab);
+CREATE INDEX IF NOT EXISTS clipsName ON clips(name);
+CREATE INDEX IF NOT EXISTS nodesTab ON nodes(tab);
+CREATE INDEX IF NOT EXISTS nodesName ON nodes(name);
+CREATE INDEX IF NOT EXISTS nodesLongName ON nodes(longName);
+-- Files whose exporter data is queried, a sidecar is only used when its scene has no exporter data of its own
+CREATE VIEW IF NOT EXISTS sources AS
+    SELECT * FROM files WHERE kind = 'scene' OR NOT EXISTS (
+        SELECT 1 FROM files AS scenes JOIN tabs ON tabs.file = scenes.id WHERE scenes.scene = files.scene AND scenes.kind = 'scene');
+"""
+
+
+############################################################################### READING ##################################################################################
+
+
+_melString = re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+_melEscape = re.compile(r'\\(.)', re.DOTALL)
+_melEscapes = {"n": "\n", "t": "\t", "r": "\r"}
+
+
+def UnescapeMelString(s):
+    return _melEscape.sub(lambda m : _melEscapes.get(m.group(1), m.group(1)), s)
+
+
+def DecodeExporterData(s):
+    """ Exporter data from its json string, falling back to stripping escapes the same way the exporter does """
+    try:
+        return json.loads(s)
+    except ValueError:
+        return json.loads(s.replace(u"\\", u""))
+
+
+def ReadSceneFileInfo(filename, key=FILE_INFO_KEY):
+    """ Raw value of a fileInfo entry from a Maya ASCII scene, or None. Only the header is read, Maya writes file info
+        before the first node so reading stops there """
+    statement = None
+    with open(filename, "rb") as inFile:
+        for line in inFile:
+            line = line.decode("utf-8", "replace")
+            if statement is not None:
+                statement += line
+            elif line.startswith("fileInfo"):
+                statement = line
+            elif line.startswith("createNode"):
+                break
+
+            # A statement can run over several lines, it's complete at the ';' after its last string
+            if statement is not None:
+                strings = list(_melString.finditer(statement))
+                if strings and statement[strings[-1].end():].strip().startswith(";"):
+                    if len(strings) >= 2 and UnescapeMelString(strings[0].group(1)) == key:
+                        return "".join(UnescapeMelString(m.group(1)) for m in strings[1:])
+                    statement = None
+    return None
+
+
+def GetSceneForMetadata(filename):
+    """ Scene a sidecar belongs to, the .ma or .mb next to it with the same base name, else the .ma it would be """
+    base = filename[:-len(METADATA_SUFFIX)]
+    for extension in SCENE_EXTENSIONS:
+        if os.path.exists(base + extension):
+            return base + extension
+    return base + SCENE_EXTENSIONS[0]
+
+
+def ReadExporterData(filename, kind):
+    """ Worker: (raw data, error) from a scene or sidecar. Runs on the pool so it must not touch the database """
+    try:
+        if kind == "scene":
+            return ReadSceneFileInfo(filename), None
+        with open(filename, "rb") as inFile:
+            return inFile.read().decode("utf-8"), None
+    except Exception as e:
+        return None, "{}: {}".format(type(e).__name__, e)
+
+
+def FindExporterFiles(root):
+    """ (path, kind) of every Maya ASCII scene & metadata sidecar under root """
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if filename.endswith(".ma"):
+                yield os.path.join(directory, filename), "scene"
+            elif filename.endswith(METADATA_SUFFIX):
+                yield os.path.join(directory, filename), "metadata"
+
+
+############################################################################### INDEX ####################################################################################
+
+
+class MetadataIndex(object):
+    """ SQLite index of exporter data across scenes & sidecars. Rows are only rewritten for files whose exporter data
+        changed, files with the same mtime & size aren't read at all. Queries prefer a scene's own file info over its
+        sidecar, so each clip is found once """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+
+
+    def Close(self):
+        self.connection.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
+        return False
+
+
+    def Scan(self, root, numJobs=None):
+        """ Bring the index up to date with every file under root. Returns counts of what changed """
+        start = time.time()
+        root = os.path.abspath(root)
+        stats = {"files": 0, "unchanged": 0, "touched": 0, "updated": 0, "removed": 0, "errors": 0}
+
+        # Stat everything & read only the files that might have changed
+        known = dict((row[0], row[1:]) for row in self.connection.execute("SELECT path, mtime, size FROM files"))
+        found = {}
+        for path, kind in FindExporterFiles(root):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found[path] = (kind, st.st_mtime, st.st_size)
+        stats["files"] = len(found)
+        toRead = [(path, kind) for path, (kind, mtime, size) in found.items() if known.get(path) != (mtime, size)]
+        stats["unchanged"] = len(found) - len(toRead)
+
+        # Read & extract in parallel, write on this thread in one transaction as results come in
+        pool = ThreadPool(max(1, min(numJobs or cpu_count(), len(toRead) or 1)))
+        try:
+            results = pool.imap_unordered(lambda job : (job, ReadExporterData(*job)), toRead, chunksize=16)
+            with self.connection:
+                for (path, kind), (raw, error) in results:
+                    kind, mtime, size = found[path]
+                    stats[self._Update(path, kind, mtime, size, raw, error)] += 1
+
+                # Forget files under root that are gone
+                prefix = root.rstrip(os.sep) + os.sep
+                for path in known:
+                    if path.startswith(prefix) and path not in found:
+                        self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                        stats["removed"] += 1
+        finally:
+            pool.close()
+
+        stats["seconds"] = time.time() - start
+        return stats
+
+
+    def _Update(self, path, kind, mtime, size, raw, error):
+        """ Store one read file, returns which stat it counts towards """
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest() if raw is not None else None
+        scene = path if kind == "scene" else GetSceneForMetadata(path)
+
+        # Decode, a file without exporter data is still recorded so it isn't read again until it changes
+        data = None
+        if raw is not None and error is None:
+            try:
+                data = DecodeExporterData(raw)
+            except ValueError as e:
+                error = "Invalid exporter data: {}".format(e)
+
+        row = self.connection.execute("SELECT id, hash, error FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[1] == digest and row[2] == error:
+            self.connection.execute("UPDATE files SET mtime = ?, size = ?, indexed = ? WHERE id = ?", (mtime, size, time.time(), row[0]))
+            return "touched"
+        if row is not None:
+            self.connection.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+        fileId = self.connection.execute("INSERT INTO files (path, kind, scene, mtime, size, hash, error, indexed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                         (path, kind, scene, mtime, size, digest, error, time.time())).lastrowid
+        tabs = data.get("tabs") if isinstance(data, dict) else None
+        for tabData in tabs or []:
+            tabId = self.connection.execute("INSERT INTO tabs (file, name, exportDirectory, bakeAnimation) VALUES (?, ?, ?, ?)",
+                                            (fileId, tabData.get("name", ""), tabData.get("exportDirectory"), tabData.get("bakeAnimation"))).lastrowid
+            self.connection.executemany("INSERT INTO clips (tab, name, frameStart, frameEnd, enabled) VALUES (?, ?, ?, ?, ?)",
+                                        [(tabId, c.get("animationName", ""), c.get("frameStart"), c.get("frameEnd"), c.get("enabled", True)) for c in tabData.get("clips") or []])
+            self.connection.executemany("INSERT INTO nodes (tab, longName, name) VALUES (?, ?, ?)",
+                                        [(tabId, n, n.rsplit("|", 1)[-1]) for n in tabData.get("exportNodes") or []])
+        return "errors" if error else "updated"
+
+
+    ####################################################################### Queries ######################################################################
+
+
+    def FindClips(self, pattern="*", enabledOnly=False):
+        """ Clips whose animation name matches a glob pattern, with the scene & tab exporting them """
+        rows = self.connection.execute("""
+            SELECT sources.scene, sources.path, tabs.name, clips.name, clips.frameStart, clips.frameEnd, clips.enabled
+            FROM clips JOIN tabs ON clips.tab = tabs.id JOIN sources ON tabs.file = sources.id
+            WHERE clips.name GLOB ? {}
+            ORDER BY sources.scene, tabs.name, clips.name""".format("AND clips.enabled" if enabledOnly else ""), (pattern,))
+        return [{"scene": r[0], "source": r[1], "tab": r[2], "animationName": r[3], "frameStart": r[4], "frameEnd": r[5], "enabled": bool(r[6])} for r in rows]
+
+
+    def FindNodes(self, pattern):
+        """ Tabs with an export node matching a glob pattern. Patterns containing '|' match long names, others short names """
+        column = "nodes.longName" if "|" in pattern else "nodes.name"
+        rows = self.connection.execute("""
+            SELECT sources.scene, sources.path, tabs.name, nodes.longName
+            FROM nodes JOIN tabs ON nodes.tab = tabs.id JOIN sources ON tabs.file = sources.id
+            WHERE {} GLOB ?
+            ORDER BY sources.scene, tabs.name, nodes.longName""".format(column), (pattern,))
+        return [{"scene": r[0], "source": r[1], "tab": r[2], "node": r[3]} for r in rows]
+
+
+    def FindScenes(self, clip=None, node=None, enabledOnly=True):
+        """ Scenes with a tab exporting a clip matching the clip pattern and/or referencing a node matching the node pattern """
+        scenes = None
+        if clip is not None:
+            scenes = set(c["scene"] for c in self.FindClips(clip, enabledOnly))
+        if node is not None:
+            found = set(n["scene"] for n in self.FindNodes(node))
+            scenes = found if scenes is None else scenes & found
+        if scenes is None:
+            scenes = set(r[0] for r in self.connection.execute("SELECT DISTINCT sources.scene FROM tabs JOIN sources ON tabs.file = sources.id"))
+        return sorted(scenes)
+
+
+    def Errors(self):
+        return [{"path": r[0], "error": r[1]} for r in self.connection.execute("SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path")]
+
+
+    def Stats(self):
+        count = lambda table : self.connection.execute("SELECT COUNT(*) FROM {}".format(table)).fetchone()[0]
+        return dict((table, count(table)) for table in ("files", "tabs", "clips", "nodes"))
+
+
+############################################################################### CLI ######################################################################################
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description="Index Animation Exporter data across a project without Maya")
+    parser.add_argument("--index", default="AnimationExporterIndex.db", help="Index database (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="Print results as json")
+    commands = parser.add_subparsers(dest="command")
+
+    scan = commands.add_parser("scan", help="Index or re-index every scene & metadata file under a directory")
+    scan.add_argument("root")
+    scan.add_argument("--jobs", type=int, default=None, help="Files read in parallel (default: cpu count)")
+
+    clips = commands.add_parser("clips", help="Clips whose name matches a glob pattern")
+    clips.add_argument("pattern")
+    clips.add_argument("--enabled", action="store_true", help="Only enabled clips")
+
+    nodes = commands.add_parser("nodes", help="Tabs referencing a node matching a glob pattern, '|' in the pattern matches long names")
+    nodes.add_argument("pattern")
+
+    scenes = commands.add_parser("scenes", help="Scenes to export for a clip and/or node, one path per line")
+    scenes.add_argument("--clip")
+    scenes.add_argument("--node")
+    scenes.add_argument("--include-disabled", action="store_true", help="Also match disabled clips")
+
+    commands.add_parser("stats", help="Index sizes & files that failed to read")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+
+    with MetadataIndex(args.index) as index:
+        if args.command == "scan":
+            result = index.Scan(args.root, args.jobs)
+            if not args.json:
+                print("Scanned {files} files in {seconds:.2f}s: {updated} updated, {touched} touched, {unchanged} unchanged, {removed} removed, {errors} errors".format(**result))
+        elif args.command == "clips":
+            result = index.FindClips(args.pattern, args.enabled)
+            if not args.json:
+                for c in result:
+                    print("{scene}  [{tab}]  {animationName}  {frameStart}-{frameEnd}{0}".format("" if c["enabled"] else "  (disabled)", **c))
+        elif args.command == "nodes":
+            result = index.FindNodes(args.pattern)
+            if not args.json:
+                for n in result:
+                    print("{scene}  [{tab}]  {node}".format(**n))
+        elif args.command == "scenes":
+            result = index.FindScenes(args.clip, args.node, not args.include_disabled)
+            if not args.json:
+                for scene in result:
+                    print(scene)
+        else:
+            result = {"counts": index.Stats(), "errors": index.Errors()}
+            if not args.json:
+                print(", ".join("{} {}".format(v, k) for k, v in sorted(result["counts"].items())))
+                for e in result["errors"]:
+                    print("{path}: {error}".format(**e))
+
+        if args.json:
+            print(json.dumps(result, indent=4))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(Main())
@@ -0,0 +1,255 @@
+"""
+Scaling benchmarks for AnimationExporter as a pytest-benchmark suite, run against synthetic scenes from MayaStub so no
+Maya is needed.
+
+    python -m pytest Benchmarks/BenchmarkAnimationExporter.py [--quick] [--max-exponent 1.5] [-k Name]
+    python Benchmarks/BenchmarkAnimationExporter.py [pytest arguments]
+
+Each benchmark is timed over a range of sizes by test_Timing, then test_Scaling fits the exponent of a log-log fit to
+the timings. Roughly 1.0 is linear, anything past --max-exponent fails as a likely O(N^2) regression.
+"""
+
+__author__  = 'Calvin Simpson'
+__company__ = 'The Multiplayer Guys'
+
+
+###########################################################################################################################################################################
+
+
+import contextlib, math, os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import MayaStub
+scene = MayaStub.Install()
+import AnimationExporter
+
+
+###########################################################################################################################################################################
+
+
+@contextlib.contextmanager
+def Quiet():
+    """ Swallow the tool's progress prints while timing """
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+def FitExponent(sizes, times):
+    """ Slope of log(time) against log(size), by least squares """
+    points = [(math.log(s), math.log(max(t, 1e-9))) for s, t in zip(sizes, times)]
+    meanX = sum(x for x, y in points) / len(points)
+    meanY = sum(y for x, y in points) / len(points)
+    denominator = sum((x - meanX) ** 2 for x, y in points)
+    if denominator == 0:
+        return 0.0
+    return sum((x - meanX) * (y - meanY) for x, y in points) / denominator
+
+
+def CreateWindow():
+    """ Exporter window loaded from the current synthetic scene """
+    with Quiet():
+        return AnimationExporter.AnimationExporterWindow()
+
+
+class ObjectTable(object):
+    """ Stand-in for the window's skin weights object list """
+
+    def __init__(self, objects):
+        self.objects = list(objects)
+
+    def GetObjects(self):
+        return self.objects
+
+
+###########################################################################################################################################################################
+
+
+def BenchmarkAddNodeFromLongName(size):
+    """ Nodes added one at a time, as from the context menu & scripts """
+    generated = scene.Generate(numJoints=size, numMeshes=0, numClips=0, numFrames=2)
+    tree = AnimationExporter.ExportNodesTree()
+    return lambda : [tree.AddNodeFromLongName(joint) for joint in generated["joints"]]
+
+
+def BenchmarkAddNodesFromData(size):
+    """ Nodes added in one batch """
+    generated = scene.Generate(numJoints=size, numMeshes=0, numClips=0, numFrames=2)
+    tree = AnimationExporter.ExportNodesTree()
+    return lambda : tree.AddNodesFromData(generated["joints"])
+
+
+def BenchmarkLoadFromData(size):
+    """ Building tabs from exporter data with size clips & export nodes per tab """
+    generated = scene.Generate(numJoints=size, numMeshes=0, numClips=size, numTabs=4, numFrames=2)
+    window = CreateWindow()
+    for i in reversed(range(window.animationTabWidget.count())):
+        del window.animationTabWidget._tabs[i]
+    return lambda : window._LoadFromData({"tabs": generated["tabs"]})
+
+
+def BenchmarkSave(size):
+    """ Gathering & encoding every tab into the file info """
+    scene.Generate(numJoints=size, numMeshes=0, numClips=size, numTabs=4, numFrames=2)
+    window = CreateWindow()
+    return window.Save
+
+
+def BenchmarkValidateClips(size):
+    """ Validating clip ranges & overlaps """
+    generated = scene.Generate(numJoints=1, numMeshes=0, numClips=size, numFrames=size)
+    return lambda : AnimationExporter.ValidateClips(generated["tabs"][0]["clips"])
+
+
+def BenchmarkExportClips(size):
+    """ Exporting size clips from a fixed rig """
+    scene.Generate(numJoints=50, numMeshes=1, numVertices=100, numClips=size, numFrames=size * 5)
+    window = CreateWindow()
+    return window.animationTabWidget.widget(0).ExportClips
+
+
+def BenchmarkExportClipsCached(size):
+    """ Exporting size clips keyed from the sample cache, timing the re-export after a first run has filled the cache """
+    scene.Generate(numJoints=50, numMeshes=1, numVertices=100, numClips=size, numFrames=size * 5)
+    window = CreateWindow()
+    tab = window.animationTabWidget.widget(0)
+    tab.cacheSamples.setChecked(True)
+    tab.ExportClips()
+    return tab.ExportClips
+
+
+def BenchmarkExportSkinWeights(size):
+    """ Gathering & writing skin weights of size vertices over 2 meshes """
+    generated = scene.Generate(numJoints=64, numMeshes=2, numVertices=size // 2, numClips=0, numFrames=2)
+    window = CreateWindow()
+    window.objectTable = ObjectTable(generated["meshes"])
+    scene.fileDialogResult = os.path.join(scene.tempDir, "SkinWeights.json")
+    return window.ExportSkinWeights
+
+
+def BenchmarkImportSkinWeights(size, byPosition=False):
+    """ Reading & applying skin weights of size vertices over 2 meshes """
+    generated = scene.Generate(numJoints=64, numMeshes=2, numVertices=size // 2, numClips=0, numFrames=2)
+    window = CreateWindow()
+    window.objectTable = ObjectTable(generated["meshes"])
+    scene.fileDialogResult = os.path.join(scene.tempDir, "SkinWeights.json")
+    window.ExportSkinWeights()
+    return lambda : window.ImportSkinWeights(byPosition=byPosition)
+
+
+def BenchmarkImportSkinWeightsByPosition(size):
+    """ Reading & applying skin weights matched by nearest vertex position """
+    assert AnimationExporter.np is not None, "numpy is required to import skin weights by position"
+    return BenchmarkImportSkinWeights(size, byPosition=True)
+
+
+def BenchmarkSkinWeightTransfer(size, influencesPerVertex=4, numInfluences=64, seed=0):
+    """ Remapping skin weights by position between synthetic meshes of size vertices, outside of the scene """
+    np = AnimationExporter.np
+    assert np is not None, "numpy is required to benchmark skin weight transfer"
+
+    # Source is a sphere, target is the same sphere jittered & with some vertices removed to mimic a topology change
+    random = np.random.RandomState(seed)
+    source = random.normal(size=(size, 3))
+    source /= np.linalg.norm(source, axis=1)[:, None]
+    target = source[random.rand(size) > 0.05] + random.normal(scale=1e-3, size=(1, 3))
+
+    joints = ["joint{}".format(i) for i in range(numInfluences)]
+    jointIndices = random.randint(0, numInfluences, size=(size, influencesPerVertex))
+    jointWeights = random.rand(size, influencesPerVertex)
+    jointWeights /= jointWeights.sum(axis=1)[:, None]
+    data = {
+        "object": "benchmarkMesh",
+        "positions": source.ravel().tolist(),
+        "vertices": [list(zip([joints[j] for j in ji], w)) for ji, w in zip(jointIndices.tolist(), jointWeights.tolist())]
+    }
+    return lambda : AnimationExporter.RemapSkinWeightsByPosition(data, target)
+
+
+NODE_SIZES = [500, 1000, 2000, 4000]
+CLIP_SIZES = [50, 100, 200, 400]
+VERTEX_SIZES = [2000, 4000, 8000, 16000]
+
+NUMPY_BENCHMARKS = set(["ImportSkinWeightsByPosition", "SkinWeightTransfer"])
+
+BENCHMARKS = [
+    ("AddNodeFromLongName", BenchmarkAddNodeFromLongName, NODE_SIZES),
+    ("AddNodesFromData", BenchmarkAddNodesFromData, NODE_SIZES),
+    ("LoadFromData", BenchmarkLoadFromData, CLIP_SIZES),
+    ("Save", BenchmarkSave, CLIP_SIZES),
+    ("ValidateClips", BenchmarkValidateClips, [1000, 2000, 4000, 8000]),
+    ("ExportClips", BenchmarkExportClips, CLIP_SIZES),
+    ("ExportClipsCached", BenchmarkExportClipsCached, CLIP_SIZES),
+    ("ExportSkinWeights", BenchmarkExportSkinWeights, VERTEX_SIZES),
+    ("ImportSkinWeights", BenchmarkImportSkinWeights, VERTEX_SIZES),
+    ("ImportSkinWeightsByPosition", BenchmarkImportSkinWeightsByPosition, VERTEX_SIZES),
+    ("SkinWeightTransfer", BenchmarkSkinWeightTransfer, [10000, 20000, 40000, 80000]),
+]
+
+
+###########################################################################################################################################################################
+
+
+# Best time of every (benchmark, size) timed so far, for the scaling tests
+TIMES = {}
+
+
+def GetSizes(sizes, quick=False):
+    return [max(1, s // 4) for s in sizes[:3]] if quick else list(sizes)
+
+
+def pytest_generate_tests(metafunc):
+    quick = metafunc.config.getoption("quick", False)
+    if "size" in metafunc.fixturenames:
+        params = [(name, size) for name, benchmark, sizes in BENCHMARKS for size in GetSizes(sizes, quick)]
+        metafunc.parametrize(("name", "size"), params, ids=["{}-{}".format(name, size) for name, size in params])
+    elif "name" in metafunc.fixturenames:
+        metafunc.parametrize("name", [b[0] for b in BENCHMARKS])
+
+
+def test_Timing(benchmark, name, size):
+    """ Time one benchmark at one size, each round on a freshly generated scene """
+    create = dict((b[0], b[1]) for b in BENCHMARKS)[name]
+    if name in NUMPY_BENCHMARKS and AnimationExporter.np is None:
+        pytest.skip("numpy isn't installed")
+
+    run = {}
+    def Setup():
+        with Quiet():
+            run["func"] = create(size)
+    def Target():
+        with Quiet():
+            run["func"]()
+
+    benchmark.group = name
+    benchmark.extra_info["size"] = size
+    benchmark.pedantic(Target, setup=Setup, rounds=3, iterations=1)
+    if benchmark.stats is not None:
+        TIMES.setdefault(name, {})[size] = benchmark.stats.stats.min
+
+
+def test_Scaling(request, name):
+    """ Fail benchmarks whose timings grow faster than --max-exponent, needs test_Timing to have run every size first """
+    sizes = GetSizes(dict((b[0], b[2]) for b in BENCHMARKS)[name], request.config.getoption("quick", False))
+    times = TIMES.get(name, {})
+    if any(size not in times for size in sizes):
+        pytest.skip("Not every size of {} was timed".format(name))
+
+    times = [times[size] for size in sizes]
+    exponent = FitExponent(sizes, times)
+    curve = "  ".join("{}: {:.4f}s".format(size, t) for size, t in zip(sizes, times))
+    print("{:<28} {}  ~O(N^{:.2f})".format(name, curve, exponent))
+    maxExponent = request.config.getoption("max_exponent", 1.5)
+    assert exponent <= maxExponent, "{} scales as ~O(N^{:.2f}), past {}: {}".format(name, exponent, maxExponent, curve)
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__] + sys.argv[1:]))
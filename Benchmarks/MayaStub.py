@@ -0,0 +1,1010 @@
+"""
+Stand-in for maya.cmds, maya.mel, maya.api.OpenMaya, pymel and, when PySide2 isn't installed, the Qt widgets used by
+AnimationExporter. Lets the tool be imported & exercised on machines without Maya, against synthetic scenes.
+
+    import MayaStub
+    scene = MayaStub.Install()
+    scene.Generate(numJoints=100, numMeshes=2, numVertices=1000)
+    import AnimationExporter
+
+Only the behaviour AnimationExporter relies on is modelled, and the stub is written to scale linearly itself so it
+doesn't hide or fake scaling problems in the tool.
+"""
+
+__author__  = 'Calvin Simpson'
+__company__ = 'The Multiplayer Guys'
+
+
+###########################################################################################################################################################################
+
+
+import atexit, bisect, json, math, os, random, re, shutil, sys, tempfile, types
+
+
+###########################################################################################################################################################################
+
+
+TYPE_PARENTS = {
+    "joint": "transform",
+    "animCurveTL": "animCurve",
+    "animCurveTA": "animCurve",
+    "animCurveTU": "animCurve",
+}
+
+DAG_TYPES = set(["transform", "joint", "mesh"])
+
+CHANNELS = ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ"]
+
+
+def IsType(nodeType, wanted):
+    """ Whether a node type is, or inherits from, the wanted type """
+    while nodeType is not None:
+        if nodeType == wanted:
+            return True
+        nodeType = TYPE_PARENTS.get(nodeType)
+    return False
+
+
+def AsList(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+class Node(object):
+    """ A scene node, DAG nodes know their parent & children """
+
+    def __init__(self, name, nodeType, parent=None):
+        self.name = name
+        self.type = nodeType
+        self.parent = parent
+        self.children = []
+        self.attrs = {}
+
+
+class Scene(object):
+    """ Synthetic scene backing the stub commands """
+
+    def __init__(self):
+        # Scene file, FBX exports & the sample cache all go here, removed at exit
+        self.tempDir = tempfile.mkdtemp(prefix="MayaStub")
+        atexit.register(self.Dispose)
+        self.Reset()
+
+
+    def Dispose(self):
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+
+    def Reset(self):
+        self.nodes = {} # Name -> Node, DAG nodes by long name
+        self.shortNames = {} # Short name -> long name
+        self.inputs = {} # Destination plug -> source plug
+        self.skinClusters = {} # Shape long name -> skinCluster name
+        self.selection = []
+        self.fileInfo = {}
+        self.sceneName = ""
+        self.modified = False
+        self.minTime = 0.0
+        self.maxTime = 100.0
+        self.time = 0.0
+        self.evaluationMode = "parallel"
+        self.undoEnabled = True
+        self.undoChunks = []
+        self._chunkDepth = 0
+        self.callbacks = {}
+        self.fbxOptions = {}
+        self.fbxExports = []
+        self.fileDialogResult = ""
+        self._nextId = 0
+
+
+    ####################################################################### Nodes ########################################################################
+
+
+    def AddNode(self, shortName, nodeType, parent=None):
+        longName = (parent + "|" + shortName) if parent else (("|" + shortName) if nodeType in DAG_TYPES else shortName)
+        node = Node(longName, nodeType, parent)
+        self.nodes[longName] = node
+        self.shortNames.setdefault(shortName, longName)
+        if parent:
+            self.nodes[parent].children.append(longName)
+        if nodeType in DAG_TYPES:
+            for channel in CHANNELS:
+                node.attrs[channel] = 1.0 if channel.startswith("scale") else 0.0
+        self._RecordUndo(lambda : self.DeleteNode(longName))
+        return longName
+
+
+    def DeleteNode(self, name):
+        node = self.nodes.pop(name, None)
+        if node is None:
+            return
+        if self.shortNames.get(name.rsplit("|", 1)[-1]) == name:
+            del self.shortNames[name.rsplit("|", 1)[-1]]
+        if node.parent and node.parent in self.nodes:
+            self.nodes[node.parent].children.remove(name)
+        for plug in [p for p, source in self.inputs.items() if source.split(".", 1)[0] == name]:
+            del self.inputs[plug]
+
+
+    def Resolve(self, name):
+        """ Long name of a node from a long or short name, None if it doesn't exist """
+        name = name.split(".", 1)[0]
+        if name in self.nodes:
+            return name
+        return self.shortNames.get(name)
+
+
+    def UniqueName(self, base):
+        self._nextId += 1
+        return "{}{}".format(base, self._nextId)
+
+
+    ####################################################################### Undo #########################################################################
+
+
+    def _RecordUndo(self, inverse):
+        if self._chunkDepth > 0:
+            self.undoChunks[-1].append(inverse)
+
+
+    def OpenChunk(self):
+        if self._chunkDepth == 0:
+            self.undoChunks.append([])
+        self._chunkDepth += 1
+
+
+    def CloseChunk(self):
+        self._chunkDepth = max(0, self._chunkDepth - 1)
+
+
+    def Undo(self):
+        if not self.undoChunks:
+            return
+        chunk = self.undoChunks.pop()
+        depth, self._chunkDepth = self._chunkDepth, 0
+        for inverse in reversed(chunk):
+            inverse()
+        self._chunkDepth = depth
+
+
+    ####################################################################### Attributes ###################################################################
+
+
+    def Connect(self, source, destination):
+        previous = self.inputs.get(destination)
+        self.inputs[destination] = source
+        def Inverse():
+            if previous is None:
+                self.inputs.pop(destination, None)
+            else:
+                self.inputs[destination] = previous
+        self._RecordUndo(Inverse)
+
+
+    def EvaluatePlug(self, plug, time=None):
+        """ Value of a single numeric plug, evaluating a connected anim curve at the time """
+        time = self.time if time is None else time
+        source = self.inputs.get(plug)
+        if source is not None:
+            curve = self.nodes.get(source.split(".", 1)[0])
+            if curve is not None and IsType(curve.type, "animCurve"):
+                return self.EvaluateCurve(curve, time)
+        nodeName, attr = plug.split(".", 1)
+        return self.nodes[nodeName].attrs.get(attr, 0.0)
+
+
+    def EvaluateCurve(self, curve, time):
+        times, values = curve.attrs["times"], curve.attrs["values"]
+        if not times:
+            return 0.0
+        i = bisect.bisect_right(times, time)
+        if i == 0:
+            return values[0]
+        if i == len(times):
+            return values[-1]
+        t = (time - times[i - 1]) / float(times[i] - times[i - 1])
+        return values[i - 1] + (values[i] - values[i - 1]) * t
+
+
+    def Notify(self, event, *args):
+        for callback in list(self.callbacks.values()):
+            if callback[0] == event:
+                callback[1](*args)
+
+
+    def SaveScene(self):
+        """ Write the file info to the scene file as a Maya ASCII header & mark the scene saved """
+        with open(self.sceneName, "w") as outFile:
+            outFile.write("//Maya ASCII scene\n")
+            for key, value in self.fileInfo.items():
+                outFile.write('fileInfo "{}" {};\n'.format(key, json.dumps(value)))
+        self.modified = False
+
+
+    ####################################################################### Generation ###################################################################
+
+
+    def Generate(self, numJoints=50, numMeshes=1, numVertices=1000, numInfluences=4, numClips=10, numTabs=1, numFrames=100,
+                 keyStep=1, seed=0):
+        """ Build a skinned, animated rig & matching exporter data. Returns the created joints, meshes & skinClusters """
+        self.Reset()
+        generator = random.Random(seed)
+        self.sceneName = os.path.join(self.tempDir, "Synthetic.ma")
+        self.minTime, self.maxTime = 0.0, float(numFrames - 1)
+
+        # Joint hierarchy, each joint parented to a random earlier one
+        rig = self.AddNode("Rig", "transform")
+        joints = []
+        for i in range(numJoints):
+            parent = joints[generator.randrange(len(joints))] if joints else rig
+            joints.append(self.AddNode("joint{}".format(i), "joint", parent))
+
+        # Animation, one curve per channel
+        frames = list(range(0, numFrames, max(1, keyStep)))
+        for joint in joints:
+            shortName = joint.rsplit("|", 1)[-1]
+            for c, channel in enumerate(CHANNELS):
+                curveType = "animCurveTL" if c < 3 else "animCurveTA" if c < 6 else "animCurveTU"
+                curve = self.AddNode("{}_{}".format(shortName, channel), curveType)
+                base = 1.0 if c >= 6 else 0.0
+                phase = generator.random() * math.pi
+                self.nodes[curve].attrs["times"] = [float(f) for f in frames]
+                self.nodes[curve].attrs["values"] = [base + math.sin(f * 0.1 + phase) * (0.0 if c >= 6 else 10.0) for f in frames]
+                self.inputs[joint + "." + channel] = curve + ".output"
+
+        # Skinned meshes, vertices on a sphere
+        meshes = []
+        skins = []
+        jointNames = [j.rsplit("|", 1)[-1] for j in joints]
+        for m in range(numMeshes):
+            mesh = self.AddNode("mesh{}".format(m), "transform")
+            shape = self.AddNode("mesh{}Shape".format(m), "mesh", mesh)
+            positions = []
+            for v in range(numVertices):
+                x, y, z = generator.gauss(0, 1), generator.gauss(0, 1), generator.gauss(0, 1)
+                length = math.sqrt(x * x + y * y + z * z) or 1.0
+                positions.extend((x / length + m * 3.0, y / length, z / length))
+            self.nodes[shape].attrs["positions"] = positions
+
+            skin = self.AddNode("skinCluster{}".format(m), "skinCluster")
+            weights = []
+            for v in range(numVertices):
+                influences = generator.sample(jointNames, min(numInfluences, len(jointNames))) if jointNames else []
+                values = [generator.random() + 1e-3 for i in influences]
+                total = sum(values)
+                weights.append([(j, w / total) for j, w in zip(influences, values)])
+            self.nodes[skin].attrs["influences"] = list(jointNames)
+            self.nodes[skin].attrs["weights"] = weights
+            self.skinClusters[shape] = skin
+            meshes.append(mesh)
+            skins.append(skin)
+
+        # Exporter data
+        tabs = []
+        for t in range(numTabs):
+            clips = []
+            # Clips laid out back to back over the frame range, like takes in a mocap scene
+            for c in range(numClips):
+                start = c * numFrames // numClips
+                end = max(start, (c + 1) * numFrames // numClips - 1 - generator.randrange(2))
+                clips.append({"enabled": True, "animationName": "Anim{}".format(c), "frameStart": start, "frameEnd": end})
+            tabs.append({
+                "name": "Tab{}".format(t),
+                "exportDirectory": self.tempDir,
+                "bakeAnimation": True,
+                "exportNodes": joints + meshes,
+                "clips": clips
+            })
+        self.fileInfo["AnimationExporterData"] = json.dumps({"tabs": tabs})
+        self.SaveScene()
+
+        return {"joints": joints, "meshes": meshes, "skinClusters": skins, "tabs": tabs}
+
+
+###########################################################################################################################################################################
+
+
+class Cmds(types.ModuleType):
+    """ maya.cmds """
+
+    def __init__(self, scene):
+        super(Cmds, self).__init__("maya.cmds")
+        self.scene = scene
+
+
+    def _Names(self, args):
+        names = []
+        for arg in args:
+            names += AsList(arg)
+        return names
+
+
+    def _Format(self, longName, long):
+        return longName if long or not longName.startswith("|") else longName.rsplit("|", 1)[-1]
+
+
+    def ls(self, *args, **kwargs):
+        scene = self.scene
+        if kwargs.get("selection") or kwargs.get("sl"):
+            names = list(scene.selection)
+        elif args:
+            names = [scene.Resolve(n) for n in self._Names(args)]
+            names = [n for n in names if n is not None]
+        else:
+            names = list(scene.nodes)
+
+        wanted = AsList(kwargs.get("type"))
+        if wanted:
+            names = [n for n in names if any(IsType(scene.nodes[n].type, t) for t in wanted)]
+        if kwargs.get("noIntermediate"):
+            names = [n for n in names if not scene.nodes[n].attrs.get("intermediateObject")]
+
+        long = kwargs.get("long") or kwargs.get("l")
+        if kwargs.get("showType"):
+            result = []
+            for n in names:
+                result += [self._Format(n, long), scene.nodes[n].type]
+            return result
+        return [self._Format(n, long) for n in names]
+
+
+    def listRelatives(self, *args, **kwargs):
+        scene = self.scene
+        result = []
+        for name in self._Names(args):
+            longName = scene.Resolve(name)
+            if longName is None:
+                continue
+            if kwargs.get("allDescendents") or kwargs.get("ad"):
+                stack = list(scene.nodes[longName].children)
+                children = []
+                while stack:
+                    child = stack.pop()
+                    children.append(child)
+                    stack += scene.nodes[child].children
+            else:
+                children = scene.nodes[longName].children
+            for child in children:
+                childType = scene.nodes[child].type
+                if (kwargs.get("shapes") or kwargs.get("s")) and childType != "mesh":
+                    continue
+                if kwargs.get("type") and not IsType(childType, kwargs["type"]):
+                    continue
+                result.append(self._Format(child, kwargs.get("fullPath") or kwargs.get("f")))
+        return result or None
+
+
+    def listHistory(self, *args, **kwargs):
+        result = []
+        for name in self._Names(args):
+            skin = self.scene.skinClusters.get(self.scene.Resolve(name))
+            if skin:
+                result.append(skin)
+        return result
+
+
+    def skinCluster(self, skin, query=False, influence=False, inf=False, **kwargs):
+        return list(self.scene.nodes[skin].attrs["influences"])
+
+
+    def _Vertex(self, component):
+        obj, index = re.match(r"(.*)\.vtx\[(\d+)\]", component).groups()
+        return obj, int(index)
+
+
+    def skinPercent(self, skin, component, query=False, transform=False, value=False, v=False, transformValue=None, **kwargs):
+        obj, index = self._Vertex(component)
+        weights = self.scene.nodes[skin].attrs["weights"]
+        if query:
+            if value or v:
+                return [w for j, w in weights[index]]
+            return [j for j, w in weights[index]]
+        weights[index] = [(j.rsplit("|", 1)[-1], w) for j, w in transformValue]
+
+
+    def polyEvaluate(self, obj, v=False, vertex=False, **kwargs):
+        shape = self._Shape(obj)
+        return len(self.scene.nodes[shape].attrs["positions"]) // 3
+
+
+    def _Shape(self, obj):
+        longName = self.scene.Resolve(obj)
+        if self.scene.nodes[longName].type == "mesh":
+            return longName
+        return [c for c in self.scene.nodes[longName].children if self.scene.nodes[c].type == "mesh"][0]
+
+
+    def xform(self, component, query=False, **kwargs):
+        return list(self.scene.nodes[self._Shape(component.split(".", 1)[0])].attrs["positions"])
+
+
+    def file(self, *args, **kwargs):
+        if kwargs.get("sceneName") or kwargs.get("sn"):
+            return self.scene.sceneName
+        if "modified" in kwargs:
+            if kwargs.get("query") or kwargs.get("q"):
+                return self.scene.modified
+            self.scene.modified = kwargs["modified"]
+        return None
+
+
+    def fileInfo(self, *args, **kwargs):
+        if kwargs.get("query") or kwargs.get("q"):
+            if args:
+                return [self.scene.fileInfo[args[0]]] if args[0] in self.scene.fileInfo else []
+            result = []
+            for key, value in self.scene.fileInfo.items():
+                result += [key, value]
+            return result
+        self.scene.fileInfo[args[0]] = args[1]
+        self.scene.modified = True
+
+
+    def playbackOptions(self, query=False, q=False, minTime=None, maxTime=None, min=None, max=None, **kwargs):
+        if query or q:
+            return self.scene.minTime if (minTime or min) else self.scene.maxTime
+        if minTime is not None:
+            self.scene.minTime = float(minTime)
+        if maxTime is not None:
+            self.scene.maxTime = float(maxTime)
+
+
+    def currentTime(self, *args, **kwargs):
+        if kwargs.get("query") or kwargs.get("q"):
+            return self.scene.time
+        self.scene.time = float(args[0])
+
+
+    def evaluationManager(self, query=False, mode=None, **kwargs):
+        if query:
+            return [self.scene.evaluationMode]
+        self.scene.evaluationMode = mode
+
+
+    def refresh(self, *args, **kwargs):
+        pass
+
+
+    def select(self, *args, **kwargs):
+        if kwargs.get("clear") or kwargs.get("cl"):
+            self.scene.selection = []
+            return
+        names = [self.scene.Resolve(n) for n in self._Names(args)]
+        missing = [n for n, longName in zip(self._Names(args), names) if longName is None]
+        if missing:
+            raise ValueError("No object matches name: {}".format(missing[0]))
+        if kwargs.get("add"):
+            self.scene.selection += names
+        else:
+            self.scene.selection = names
+
+
+    def getAttr(self, plug, time=None, lock=False, **kwargs):
+        if lock:
+            return False
+        nodeName, attr = plug.split(".", 1)
+        longName = self.scene.Resolve(nodeName)
+        if attr in ("translate", "rotate", "scale"):
+            return [tuple(self.scene.EvaluatePlug("{}.{}{}".format(longName, attr, axis), time) for axis in "XYZ")]
+        return self.scene.EvaluatePlug("{}.{}".format(longName, attr), time)
+
+
+    def setAttr(self, plug, *values, **kwargs):
+        nodeName, attr = plug.split(".", 1)
+        node = self.scene.nodes[self.scene.Resolve(nodeName)]
+        if attr.startswith("ktv["):
+            node.attrs["times"] = [float(t) for t in values[0::2]]
+            node.attrs["values"] = [float(v) for v in values[1::2]]
+            self.scene.modified = True
+        else:
+            previous = node.attrs.get(attr)
+            node.attrs[attr] = values[0]
+            self.scene._RecordUndo(lambda : node.attrs.__setitem__(attr, previous))
+            self.scene.modified = True
+
+
+    def createNode(self, nodeType, **kwargs):
+        # DG edits dirty the scene like in Maya, undoing them doesn't clean it
+        self.scene.modified = True
+        return self.scene.AddNode(self.scene.UniqueName(nodeType), nodeType)
+
+
+    def connectAttr(self, source, destination, force=False, **kwargs):
+        nodeName, attr = destination.split(".", 1)
+        self.scene.modified = True
+        self.scene.Connect(source, "{}.{}".format(self.scene.Resolve(nodeName), attr))
+
+
+    def keyframe(self, *args, **kwargs):
+        scene = self.scene
+        names = self._Names(args)
+        if kwargs.get("name"):
+            curves = []
+            for name in names:
+                longName = scene.Resolve(name)
+                for channel in CHANNELS:
+                    source = scene.inputs.get("{}.{}".format(longName, channel))
+                    if source is not None:
+                        curves.append(source.split(".", 1)[0])
+            return curves
+        result = []
+        for name in names:
+            curve = scene.nodes[name]
+            result += curve.attrs["times"] if kwargs.get("timeChange") or kwargs.get("tc") else curve.attrs["values"]
+        return result
+
+
+    def cutKey(self, *args, **kwargs):
+        for name in self._Names(args):
+            curve = self.scene.nodes[name]
+            times, values = curve.attrs.get("times"), curve.attrs.get("values")
+            curve.attrs["times"], curve.attrs["values"] = [], []
+            self.scene._RecordUndo(lambda curve=curve, times=times, values=values : curve.attrs.update(times=times, values=values))
+        self.scene.modified = True
+
+
+    def keyTangent(self, *args, **kwargs):
+        if kwargs.get("query") or kwargs.get("q"):
+            return [0.0] * sum(len(self.scene.nodes[n].attrs["times"]) for n in self._Names(args))
+
+
+    def undoInfo(self, query=False, state=None, openChunk=False, closeChunk=False, **kwargs):
+        if query:
+            return self.scene.undoEnabled
+        if openChunk:
+            self.scene.OpenChunk()
+        if closeChunk:
+            self.scene.CloseChunk()
+
+
+    def undo(self):
+        self.scene.Undo()
+
+
+    def internalVar(self, **kwargs):
+        return self.scene.tempDir + "/"
+
+
+class Mel(types.ModuleType):
+    """ maya.mel """
+
+    def __init__(self, scene):
+        super(Mel, self).__init__("maya.mel")
+        self.scene = scene
+
+
+    def eval(self, command):
+        if command.startswith("findRelatedSkinCluster "):
+            obj = command.split(" ", 1)[1]
+            try:
+                return self.scene.skinClusters.get(Cmds._Shape(sys.modules["maya.cmds"], obj), "")
+            except:
+                return ""
+        return None
+
+
+class FbxMel(object):
+    """ pm.mel, FBX commands record their options & exports write a small file so outputs exist on disk """
+
+    def __init__(self, scene):
+        self.scene = scene
+
+
+    def FBXExport(self, f=None, s=False):
+        """ Records the animation like the FBX exporter would: baking evaluates every channel on every frame of the bake
+            range, otherwise the keys of connected curves within the time slider are copied """
+        scene = self.scene
+        animation = {}
+        for node in scene.selection:
+            if not IsType(scene.nodes[node].type, "transform"):
+                continue
+            for channel in CHANNELS:
+                plug = "{}.{}".format(node, channel)
+                if scene.fbxOptions.get("FBXExportBakeComplexAnimation"):
+                    start, end = int(scene.fbxOptions["FBXExportBakeComplexStart"]), int(scene.fbxOptions["FBXExportBakeComplexEnd"])
+                    animation[plug] = [(float(t), scene.EvaluatePlug(plug, t)) for t in range(start, end + 1)]
+                elif plug in scene.inputs:
+                    curve = scene.nodes[scene.inputs[plug].split(".", 1)[0]]
+                    animation[plug] = [(t, v) for t, v in zip(curve.attrs["times"], curve.attrs["values"]) if scene.minTime <= t <= scene.maxTime]
+
+        scene.fbxExports.append((f, list(scene.selection), dict(scene.fbxOptions), animation))
+        with open(f, "w") as outFile:
+            json.dump({"selection": len(scene.selection), "options": scene.fbxOptions}, outFile)
+
+
+    def __getattr__(self, name):
+        if not name.startswith("FBX"):
+            raise AttributeError(name)
+        def Option(v=None, **kwargs):
+            self.scene.fbxOptions[name] = v
+        return Option
+
+
+class Pymel(types.ModuleType):
+    """ pymel.all """
+
+    def __init__(self, scene, cmds):
+        super(Pymel, self).__init__("pymel.all")
+        self.mel = FbxMel(scene)
+        self.cmds = cmds
+        self.Path = str
+
+
+    def playbackOptions(self, q=False, min=False, max=False, **kwargs):
+        return self.cmds.playbackOptions(query=q, min=min, max=max)
+
+
+    def internalVar(self, **kwargs):
+        return self.cmds.internalVar(**kwargs)
+
+
+    def select(self, *args, **kwargs):
+        return self.cmds.select(*args, **kwargs)
+
+
+    def ls(self, *args, **kwargs):
+        return self.cmds.ls(*args, **kwargs)
+
+
+class OpenMaya(types.ModuleType):
+    """ maya.api.OpenMaya, messages register with the scene so tests can fire them """
+
+    def __init__(self, scene):
+        super(OpenMaya, self).__init__("maya.api.OpenMaya")
+
+        def Register(event):
+            def Add(*args):
+                callback = [a for a in args if callable(a)][0]
+                callbackId = len(scene.callbacks) + 1
+                scene.callbacks[callbackId] = (event, callback)
+                return callbackId
+            return staticmethod(Add)
+
+        self.MDagMessage = type("MDagMessage", (object,), {"addAllDagChangesCallback": Register("dagChanged")})
+        self.MDGMessage = type("MDGMessage", (object,), {"addNodeRemovedCallback": Register("nodeRemoved"), "addConnectionCallback": Register("connection")})
+        self.MSceneMessage = type("MSceneMessage", (object,), {"kAfterOpen": 0, "kAfterNew": 1, "addCallback": Register("scene")})
+
+        def RemoveCallbacks(ids):
+            for callbackId in ids:
+                scene.callbacks.pop(callbackId, None)
+        self.MMessage = type("MMessage", (object,), {"removeCallbacks": staticmethod(RemoveCallbacks)})
+
+
+###########################################################################################################################################################################
+
+
+class Signal(object):
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def emit(self, *args):
+        for slot in self._slots:
+            slot(*args)
+
+
+class _QtMeta(type):
+    def __getattr__(cls, name):
+        # Enums, flags & static helpers nobody reads back
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return QtObject()
+
+
+class QtObject(_QtMeta("_QtBase", (object,), {})):
+    """ Accepts any constructor, method call or chained attribute as a no-op """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return QtObject()
+
+    def __call__(self, *args, **kwargs):
+        return QtObject()
+
+    def __or__(self, other):
+        return self
+    __xor__ = __ror__ = __and__ = __or__
+
+
+class QTreeWidgetItem(QtObject):
+
+    def __init__(self, *args, **kwargs):
+        self._texts = {}
+        self._children = []
+        self._parent = None
+        self._hidden = False
+
+    def setText(self, column, text):
+        self._texts[column] = text
+
+    def text(self, column):
+        return self._texts.get(column, "")
+
+    def setIcon(self, column, icon):
+        pass
+
+    def child(self, index):
+        return self._children[index]
+
+    def childCount(self):
+        return len(self._children)
+
+    def removeChild(self, item):
+        self._children.remove(item)
+
+    def parent(self):
+        return self._parent
+
+    def setHidden(self, hidden):
+        self._hidden = hidden
+
+    def isHidden(self):
+        return self._hidden
+
+
+class QTreeWidget(QtObject):
+
+    def __init__(self, *args, **kwargs):
+        self._root = QTreeWidgetItem()
+        self._sorting = False
+
+    def invisibleRootItem(self):
+        return self._root
+
+    def addTopLevelItem(self, item):
+        children = self._root._children
+        if self._sorting:
+            # Sorted insert, Qt keeps the model ordered while sorting is on
+            lo, hi = 0, len(children)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if children[mid].text(0) <= item.text(0):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            children.insert(lo, item)
+        else:
+            children.append(item)
+
+    def addTopLevelItems(self, items):
+        for item in items:
+            self.addTopLevelItem(item)
+
+    def setSortingEnabled(self, enabled):
+        self._sorting = enabled
+        if enabled:
+            self._root._children.sort(key=lambda c: c.text(0))
+
+    def selectedItems(self):
+        return []
+
+
+class QCheckBox(QtObject):
+
+    def __init__(self, text="", checked=False, **kwargs):
+        self._checked = checked
+
+    def setChecked(self, checked):
+        self._checked = checked
+
+    def isChecked(self):
+        return self._checked
+
+
+class QLineEdit(QtObject):
+
+    def __init__(self, text="", **kwargs):
+        self._text = text
+        self.textChanged = Signal()
+        self.textEdited = Signal()
+
+    def setText(self, text):
+        if text != self._text:
+            self._text = text
+            self.textChanged.emit(text)
+
+    def text(self):
+        return self._text
+
+
+class QSpinBox(QtObject):
+
+    def __init__(self, *args, **kwargs):
+        self._value = 0
+        self._range = (0, 99)
+
+    def setRange(self, minimum, maximum):
+        self._range = (minimum, maximum)
+
+    def setValue(self, value):
+        self._value = max(self._range[0], min(self._range[1], int(value)))
+
+    def value(self):
+        return self._value
+
+
+class QTableWidget(QtObject):
+
+    def __init__(self, *args, **kwargs):
+        self._rows = []
+        self._hidden = set()
+
+    def rowCount(self):
+        return len(self._rows)
+
+    def setRowCount(self, count):
+        del self._rows[count:]
+        self._rows += [{} for i in range(count - len(self._rows))]
+
+    def insertRow(self, row):
+        self._rows.insert(row, {})
+
+    def removeRow(self, row):
+        if 0 <= row < len(self._rows):
+            del self._rows[row]
+
+    def setCellWidget(self, row, column, widget):
+        self._rows[row][column] = widget
+
+    def cellWidget(self, row, column):
+        return self._rows[row].get(column)
+
+    def item(self, row, column):
+        return None
+
+    def setRowHidden(self, row, hidden):
+        if hidden:
+            self._hidden.add(row)
+        else:
+            self._hidden.discard(row)
+
+    def isRowHidden(self, row):
+        return row in self._hidden
+
+    def selectedIndexes(self):
+        return []
+
+    def currentRow(self):
+        return -1
+
+
+class QTabWidget(QtObject):
+
+    def __init__(self, *args, **kwargs):
+        self._tabs = []
+        self._current = -1
+
+    def addTab(self, widget, label):
+        self._tabs.append([widget, label])
+        return len(self._tabs) - 1
+
+    def count(self):
+        return len(self._tabs)
+
+    def widget(self, index):
+        return self._tabs[index][0] if 0 <= index < len(self._tabs) else None
+
+    def currentIndex(self):
+        return self._current
+
+    def setCurrentIndex(self, index):
+        self._current = index
+
+    def setTabText(self, index, text):
+        self._tabs[index][1] = text
+
+
+class QMessageBox(QtObject):
+    Ok = 0x400
+    Cancel = 0x400000
+
+    @staticmethod
+    def warning(*args, **kwargs):
+        return QMessageBox.Ok
+    critical = question = information = warning
+
+    def exec_(self):
+        return QMessageBox.Ok
+
+
+def InstallQt(scene):
+    """ Headless Qt stand-ins, only used when PySide2 isn't installed """
+
+    class QFileDialog(QtObject):
+        @staticmethod
+        def getSaveFileName(*args, **kwargs):
+            return (scene.fileDialogResult, "")
+        getOpenFileName = getSaveFileName
+
+        @staticmethod
+        def getExistingDirectory(*args, **kwargs):
+            return scene.fileDialogResult
+
+    class QInputDialog(QtObject):
+        @staticmethod
+        def getInt(parent, title, label, value=0, *args, **kwargs):
+            return (value, False)
+
+        @staticmethod
+        def getText(*args, **kwargs):
+            return ("", False)
+
+    widgets = {
+        "QTreeWidget": QTreeWidget, "QTreeWidgetItem": QTreeWidgetItem, "QTableWidget": QTableWidget,
+        "QCheckBox": QCheckBox, "QLineEdit": QLineEdit, "QSpinBox": QSpinBox, "QTabWidget": QTabWidget,
+        "QMessageBox": QMessageBox, "QFileDialog": QFileDialog, "QInputDialog": QInputDialog,
+    }
+    generic = ["Qt", "QSize", "QSettings", "QIcon", "QWidget", "QMainWindow", "QDialog", "QPushButton", "QToolButton",
+               "QToolBar", "QMenu", "QAction", "QLabel", "QVBoxLayout", "QHBoxLayout", "QSplitter", "QSizePolicy",
+               "QHeaderView", "QAbstractItemView"]
+    for name in generic:
+        widgets[name] = type(name, (QtObject,), {})
+    widgets["qApp"] = QtObject()
+
+    package = types.ModuleType("PySide2")
+    sys.modules["PySide2"] = package
+    for moduleName in ("QtCore", "QtGui", "QtWidgets"):
+        module = types.ModuleType("PySide2." + moduleName)
+        module.__dict__.update(widgets)
+        setattr(package, moduleName, module)
+        sys.modules[module.__name__] = module
+    shiboken = types.ModuleType("shiboken2")
+    shiboken.wrapInstance = lambda *args: None
+    sys.modules["shiboken2"] = shiboken
+
+
+###########################################################################################################################################################################
+
+
+def Install(scene=None):
+    """ Register the stub modules, returns the scene they operate on, already installed stubs keep their scene """
+    installed = sys.modules.get("maya.cmds")
+    if scene is None and isinstance(installed, Cmds):
+        return installed.scene
+    scene = scene or Scene()
+
+    cmds = Cmds(scene)
+    maya = types.ModuleType("maya")
+    maya.cmds = cmds
+    maya.mel = Mel(scene)
+    maya.OpenMayaUI = types.ModuleType("maya.OpenMayaUI")
+    maya.OpenMayaUI.MQtUtil = type("MQtUtil", (object,), {"mainWindow": staticmethod(lambda : None)})
+    maya.api = types.ModuleType("maya.api")
+    maya.api.OpenMaya = OpenMaya(scene)
+    maya.app = types.ModuleType("maya.app")
+    maya.app.general = types.ModuleType("maya.app.general")
+    maya.app.general.mayaMixin = types.ModuleType("maya.app.general.mayaMixin")
+    maya.app.general.mayaMixin.MayaQWidgetDockableMixin = object
+
+    sys.modules.update({
+        "maya": maya,
+        "maya.cmds": cmds,
+        "maya.mel": maya.mel,
+        "maya.OpenMayaUI": maya.OpenMayaUI,
+        "maya.api": maya.api,
+        "maya.api.OpenMaya": maya.api.OpenMaya,
+        "maya.app": maya.app,
+        "maya.app.general": maya.app.general,
+        "maya.app.general.mayaMixin": maya.app.general.mayaMixin,
+    })
+    pymel = types.ModuleType("pymel")
+    pymel.all = Pymel(scene, cmds)
+    sys.modules["pymel"] = pymel
+    sys.modules["pymel.all"] = pymel.all
+
+    try:
+        import PySide2
+    except ImportError:
+        InstallQt(scene)
+
+    return scene
@@ -0,0 +1,158 @@
+"""
+Checks of AnimationExporterIndex against synthetic Maya ASCII scenes & metadata sidecars, no Maya is needed.
+
+    python -m pytest Benchmarks/TestAnimationExporterIndex.py
+    python Benchmarks/TestAnimationExporterIndex.py
+"""
+
+__author__  = 'Calvin Simpson'
+__company__ = 'The Multiplayer Guys'
+
+
+###########################################################################################################################################################################
+
+
+import contextlib, json, os, shutil, sys, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import AnimationExporterIndex as Index
+
+
+###########################################################################################################################################################################
+
+
+def ExporterData(tabName, clipNames, nodes=("|root|pelvis",)):
+    clips = [{"animationName": name, "frameStart": i * 10, "frameEnd": i * 10 + 9, "enabled": True} for i, name in enumerate(clipNames)]
+    return {"tabs": [{"name": tabName, "exportDirectory": "C:\\Export\\Anims", "bakeAnimation": True, "clips": clips, "exportNodes": list(nodes)}]}
+
+
+def MelString(s):
+    return '"{}"'.format(s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t"))
+
+
+def WriteScene(filename, data=None, chunkSize=40):
+    """ Maya ASCII header with the exporter data split over '+' joined strings like Maya writes long file info, followed
+        by a node & a decoy file info entry the reader must never reach """
+    with open(filename, "w") as outFile:
+        outFile.write("//Maya ASCII 2022 scene\n")
+        outFile.write('requires maya "2022";\n')
+        outFile.write('fileInfo "application" "maya";\n')
+        if data is not None:
+            value = json.dumps(data)
+            chunks = [value[i:i + chunkSize] for i in range(0, len(value), chunkSize)]
+            outFile.write("fileInfo {} {};\n".format(MelString(Index.FILE_INFO_KEY), "\n\t\t+ ".join(MelString(c) for c in chunks)))
+        outFile.write('createNode transform -n "pelvis";\n')
+        outFile.write("fileInfo {} {};\n".format(MelString(Index.FILE_INFO_KEY), MelString(json.dumps(ExporterData("Decoy", ["Decoy"])))))
+
+
+def WriteSidecar(filename, data):
+    with open(filename, "w") as outFile:
+        json.dump(data, outFile)
+
+
+@contextlib.contextmanager
+def Project():
+    """ Temporary project directory & an index kept outside of it """
+    root = tempfile.mkdtemp()
+    try:
+        project = os.path.join(root, "Project")
+        os.makedirs(os.path.join(project, "Characters"))
+        with Index.MetadataIndex(os.path.join(root, "Index.db")) as index:
+            yield project, index
+    finally:
+        shutil.rmtree(root)
+
+
+def ClipNames(index, pattern="*"):
+    return sorted(c["animationName"] for c in index.FindClips(pattern))
+
+
+###########################################################################################################################################################################
+
+
+def test_UnescapeMelString():
+    assert Index.UnescapeMelString(r'a\"b\\c\nd\te') == 'a"b\\c\nd\te'
+
+
+def test_ReadSceneFileInfo():
+    with Project() as (project, index):
+        data = ExporterData('Say "Hi"', ["Run\\Fast", "Walk\nSlow", "Idle"])
+        filename = os.path.join(project, "Hero.ma")
+        WriteScene(filename, data)
+
+        raw = Index.ReadSceneFileInfo(filename)
+        assert raw == json.dumps(data)
+        assert Index.DecodeExporterData(raw) == data
+        assert Index.ReadSceneFileInfo(filename, "application") == "maya"
+
+
+def test_ReadSceneFileInfoStopsAtFirstNode():
+    with Project() as (project, index):
+        filename = os.path.join(project, "Empty.ma")
+        WriteScene(filename)
+        assert Index.ReadSceneFileInfo(filename) is None
+
+
+def test_IncrementalScan():
+    with Project() as (project, index):
+        hero = os.path.join(project, "Characters", "Hero.ma")
+        villain = os.path.join(project, "Characters", "Villain_Metadata.json")
+        WriteScene(hero, ExporterData("Hero", ["Run", "Walk"]))
+        WriteSidecar(villain, ExporterData("Villain", ["Attack"]))
+
+        stats = index.Scan(project, numJobs=2)
+        assert (stats["files"], stats["updated"], stats["errors"]) == (2, 2, 0)
+        assert ClipNames(index) == ["Attack", "Run", "Walk"]
+        assert index.FindScenes(clip="Attack") == [os.path.join(project, "Characters", "Villain.ma")]
+
+        # Nothing changed, nothing is read
+        stats = index.Scan(project)
+        assert (stats["unchanged"], stats["updated"], stats["touched"]) == (2, 0, 0)
+
+        # Saved without changing the exporter data is only touched, changed data replaces the file's rows
+        mtime = os.stat(hero).st_mtime + 10
+        os.utime(hero, (mtime, mtime))
+        WriteSidecar(villain, ExporterData("Villain", ["Attack", "Taunt"]))
+        stats = index.Scan(project)
+        assert (stats["unchanged"], stats["updated"], stats["touched"]) == (0, 1, 1)
+        assert ClipNames(index) == ["Attack", "Run", "Taunt", "Walk"]
+
+        # Deleted files are forgotten
+        os.remove(villain)
+        stats = index.Scan(project)
+        assert (stats["files"], stats["removed"]) == (1, 1)
+        assert ClipNames(index) == ["Run", "Walk"]
+        assert index.Stats()["files"] == 1
+
+
+def test_SceneWithSidecar():
+    with Project() as (project, index):
+        scene = os.path.join(project, "Hero.ma")
+        sidecar = os.path.join(project, "Hero_Metadata.json")
+        WriteScene(scene, ExporterData("Hero", ["Run", "Walk"]))
+        WriteSidecar(sidecar, ExporterData("Hero", ["Run", "Walk"]))
+        index.Scan(project)
+
+        # Both files are indexed, but each clip & node is found once, from the scene's own file info
+        assert index.Stats()["clips"] == 4
+        clips = index.FindClips()
+        assert [c["animationName"] for c in clips] == ["Run", "Walk"]
+        assert set(c["source"] for c in clips) == set([scene])
+        assert [n["source"] for n in index.FindNodes("pelvis")] == [scene]
+        assert index.FindScenes(clip="Run", node="pelvis") == [scene]
+
+        # The sidecar is used once the scene no longer has exporter data
+        WriteScene(scene)
+        mtime = os.stat(scene).st_mtime + 10
+        os.utime(scene, (mtime, mtime))
+        index.Scan(project)
+        assert [c["source"] for c in index.FindClips()] == [sidecar, sidecar]
+        assert index.FindScenes() == [scene]
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print("{} passed".format(name))
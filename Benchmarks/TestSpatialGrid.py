@@ -0,0 +1,88 @@
+"""
+Correctness checks of SpatialGrid against brute force nearest-neighbour search, against a stub Maya.
+
+    python -m pytest Benchmarks/TestSpatialGrid.py
+    python Benchmarks/TestSpatialGrid.py
+"""
+
+__author__  = 'Calvin Simpson'
+__company__ = 'The Multiplayer Guys'
+
+
+###########################################################################################################################################################################
+
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import MayaStub
+MayaStub.Install()
+import AnimationExporter
+import numpy as np
+
+
+###########################################################################################################################################################################
+
+
+def Sphere(numPoints, seed=0):
+    random = np.random.RandomState(seed)
+    points = random.normal(size=(numPoints, 3))
+    return points / np.linalg.norm(points, axis=1)[:, None]
+
+
+def BruteForceDistances(points, queries):
+    return np.array([np.sqrt(((points - q) ** 2).sum(axis=1).min()) for q in queries])
+
+
+def CheckGrid(points, queries):
+    grid = AnimationExporter.SpatialGrid(points)
+
+    # Cell keys must come from the final cell size
+    keys = grid._Keys(grid._Cells(grid.points))
+    assert np.array_equal(np.unique(keys), grid.cellKeys)
+
+    indices, distances = grid.Query(queries)
+    expected = BruteForceDistances(grid.points, queries)
+    assert np.allclose(distances, expected, atol=1e-9)
+    assert np.allclose(np.linalg.norm(grid.points[indices] - queries, axis=1), expected, atol=1e-9)
+    return grid
+
+
+###########################################################################################################################################################################
+
+
+def test_Sphere():
+    points = Sphere(5000)
+    CheckGrid(points, points + np.random.RandomState(1).normal(scale=1e-2, size=points.shape))
+
+
+def test_QueriesOffTheSurface():
+    points = Sphere(2000)
+    queries = np.random.RandomState(2).uniform(-3, 3, size=(500, 3))
+    CheckGrid(points, queries)
+
+
+def test_FlatMesh():
+    random = np.random.RandomState(3)
+    points = np.column_stack([random.rand(3000), random.rand(3000), np.zeros(3000)])
+    CheckGrid(points, points + random.normal(scale=1e-3, size=points.shape))
+
+
+def test_CoincidentVertices():
+    # Duplicated shells, every position shared by 4 vertices, so cells stop shrinking only on the last pass
+    points = np.tile(Sphere(5000), (4, 1))
+    grid = CheckGrid(points, Sphere(1000, seed=4) * 1.001)
+    assert grid.cellCounts.mean() < 32, "Coincident vertices collapsed the grid cells"
+
+
+def test_SinglePoint():
+    CheckGrid(np.zeros((1, 3)), np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0]]))
+
+
+if __name__ == '__main__':
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print("{} passed".format(name))
@@ -0,0 +1,11 @@
+"""
+Options for the benchmark suite in BenchmarkAnimationExporter.py
+"""
+
+__author__  = 'Calvin Simpson'
+__company__ = 'The Multiplayer Guys'
+
+
+def pytest_addoption(parser):
+    parser.addoption("--quick", action="store_true", help="Smaller benchmark sizes, for a fast sanity check")
+    parser.addoption("--max-exponent", type=float, default=1.5, help="Scaling exponent past which a benchmark fails")